@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from tracing import span
+
+
+class AgentDAG:
+    """
+    Runs agents as a dependency graph instead of one after another.
+
+    Agents without dependencies start immediately and run concurrently. Every other agent starts
+    once all of its dependencies have answered and receives their responses after the user
+    message. Responses are yielded in a fixed order so the output reads the same as a sequential run.
+    """
+
+    def __init__(self, agents: dict, dependencies: dict, order: list):
+        """
+        Initialize the agent graph.
+
+        :param agents: Agents keyed by name.
+        :param dependencies: Names of the agents each agent waits for, keyed by agent name.
+        :param order: Order in which the responses are yielded.
+        """
+        self.agents = agents
+        self.dependencies = dependencies
+        self.order = order
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visited = set()
+        visiting = set()
+
+        def visit(name):
+            if name in visiting:
+                raise ValueError(f"Agent dependency cycle detected at {name}")
+            if name not in visited:
+                visiting.add(name)
+                for dependency in self.dependencies.get(name, []):
+                    visit(dependency)
+                visiting.remove(name)
+                visited.add(name)
+
+        for name in self.order:
+            visit(name)
+
+    async def _run_agent(self, name, user_message, tasks):
+        dependency_messages = [await tasks[dependency] for dependency in self.dependencies.get(name, [])]
+        with span("agent_turn", agent=name, orchestration="dag") as current:
+            response = await self.agents[name].get_response(messages=[user_message, *dependency_messages])
+            message = response.message
+            current.record_usage(message.metadata.get("usage"))
+        message.name = name
+        return message
+
+    async def run(self, user_message: ChatMessageContent):
+        """
+        Run every agent in the graph for a user message.
+
+        :param user_message: The message that starts the evaluation.
+        :return: Async iterator over the agent responses in the configured order.
+        """
+        tasks = {}
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(self._run_agent(name, user_message, tasks))
+
+        try:
+            for name in self.order:
+                yield await tasks[name]
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def _stream_agent(self, name, user_message, tasks, queue, ttft):
+        try:
+            dependency_messages = [await tasks[dependency] for dependency in self.dependencies.get(name, [])]
+            started = time.perf_counter()
+            parts = []
+            with span("agent_turn", agent=name, orchestration="dag", streaming=True) as current:
+                async for response in self.agents[name].invoke_stream(messages=[user_message, *dependency_messages]):
+                    current.record_usage(response.metadata.get("usage"))
+                    # Each item wraps a streaming message; its text is on the message, not on the item
+                    token = response.message.content
+                    if token:
+                        if not parts:
+                            current.set("ttft_ms", (time.perf_counter() - started) * 1000)
+                            if ttft is not None:
+                                ttft[name] = time.perf_counter() - started
+                        parts.append(token)
+                        await queue.put(token)
+            return ChatMessageContent(role=AuthorRole.ASSISTANT, name=name, content="".join(parts))
+        finally:
+            # Always unblock the consumer, even if the agent failed
+            queue.put_nowait(None)
+
+    async def run_stream(self, user_message: ChatMessageContent, ttft: dict = None):
+        """
+        Run every agent in the graph for a user message, streaming their tokens.
+
+        Agents stream concurrently; tokens of agents later in the order are buffered until the
+        agents before them have finished, so each response is streamed in one piece.
+
+        :param user_message: The message that starts the evaluation.
+        :param ttft: Optional dict receiving each agent's time to first token in seconds.
+        :return: Async iterator over (agent name, token) pairs in the configured order.
+        """
+        queues = {name: asyncio.Queue() for name in self.order}
+        tasks = {}
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(self._stream_agent(name, user_message, tasks, queues[name], ttft))
+
+        try:
+            for name in self.order:
+                while (token := await queues[name].get()) is not None:
+                    yield name, token
+                # Surfaces the agent's error, if any
+                await tasks[name]
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+
+def user_message(content: str) -> ChatMessageContent:
+    """Wrap a prompt in a user chat message."""
+    return ChatMessageContent(role=AuthorRole.USER, content=content)
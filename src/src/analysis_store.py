@@ -0,0 +1,232 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Bump when the stored record format changes so older records are ignored
+STORE_VERSION = 1
+
+
+class SQLiteAnalysisBackend:
+    """
+    Key-value backend of the analysis store in a local SQLite database.
+
+    Any object with the same get, put and delete methods, e.g. one backed by Azure Table Storage or
+    Cosmos DB so scaled-out replicas share sessions, can be registered in ANALYSIS_STORE_BACKENDS.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the SQLite backend.
+
+        :param db_path: Path of the SQLite database file.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, namespace: str, key: str):
+        """
+        Look up a record.
+
+        :param namespace: Record type, e.g. "session" or "analysis".
+        :param key: Record key.
+        :return: The decoded record, or None if missing.
+        """
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM records WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value):
+        """
+        Store a record, replacing any previous one.
+
+        :param namespace: Record type.
+        :param key: Record key.
+        :param value: JSON-serializable record.
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO records (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str), time.time()),
+            )
+
+    def delete(self, namespace: str, key: str):
+        """
+        Delete a record if it exists.
+
+        :param namespace: Record type.
+        :param key: Record key.
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM records WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+class AnalysisStore:
+    """
+    Persistent store of completed analysis work, so a browser refresh or a restarted container
+    resumes a session without repeating any model or search calls.
+
+    Summaries and retrieved agent context are stored per pair of document hashes and can be reused by
+    any session analyzing the same documents. Each session records its document hashes and the chat
+    transcript.
+    """
+
+    def __init__(self, backend):
+        """
+        Initialize the analysis store.
+
+        :param backend: Key-value backend, e.g. SQLiteAnalysisBackend.
+        """
+        self.backend = backend
+
+    @staticmethod
+    def document_hash(file_obj) -> str:
+        """
+        Hash the content of an uploaded document.
+
+        :param file_obj: File-like object of the document.
+        :return: Hex digest of the document bytes.
+        """
+        file_obj.seek(0)
+        digest = hashlib.sha256(file_obj.read()).hexdigest()
+        file_obj.seek(0)
+        return digest
+
+    @staticmethod
+    def _analysis_key(rfp_hash: str, proposal_hash: str) -> str:
+        return f"{STORE_VERSION}:{rfp_hash}:{proposal_hash}"
+
+    def get_session(self, session_id: str) -> dict:
+        """
+        Returns the stored record of a session, or None if unknown.
+
+        :param session_id: The session UID.
+        :return: Dict with the document hashes and the chat transcript in "responses".
+        """
+        record = self.backend.get("session", session_id)
+        return record if record and record.get("version") == STORE_VERSION else None
+
+    def start_session(self, session_id: str, rfp_hash: str, proposal_hash: str):
+        """
+        Record the documents a session analyzes.
+
+        :param session_id: The session UID.
+        :param rfp_hash: Hash of the RFP document.
+        :param proposal_hash: Hash of the vendor proposal document.
+        """
+        self.backend.put("session", session_id, {"version": STORE_VERSION, "rfp_hash": rfp_hash,
+                                                 "proposal_hash": proposal_hash, "responses": []})
+
+    def save_transcript(self, session_id: str, responses: list):
+        """
+        Store the chat transcript of a session.
+
+        :param session_id: The session UID.
+        :param responses: Chat messages as shown in the UI, dicts with "role" and "content".
+        """
+        record = self.get_session(session_id)
+        if record is not None:
+            record["responses"] = responses
+            self.backend.put("session", session_id, record)
+
+    def get_analysis(self, session_id: str) -> dict:
+        """
+        Returns the stored summaries and agent context of a session's documents.
+
+        :param session_id: The session UID.
+        :return: Dict with "rfp_summary", "proposal_summary" and, once retrieved, "context"; empty if nothing is stored.
+        """
+        record = self.get_session(session_id)
+        if record is None:
+            return {}
+        return self.backend.get("analysis", self._analysis_key(record["rfp_hash"], record["proposal_hash"])) or {}
+
+    def update_analysis(self, session_id: str, **values):
+        """
+        Store summaries or agent context for a session's documents.
+
+        :param session_id: The session UID.
+        :param values: Fields to store, e.g. rfp_summary, proposal_summary or context.
+        """
+        record = self.get_session(session_id)
+        if record is None:
+            return
+        key = self._analysis_key(record["rfp_hash"], record["proposal_hash"])
+        analysis = self.backend.get("analysis", key) or {}
+        analysis.update(values)
+        self.backend.put("analysis", key, analysis)
+
+
+# Backends selectable with ANALYSIS_STORE_BACKEND; each factory takes no arguments
+ANALYSIS_STORE_BACKENDS = {
+    "sqlite": lambda: SQLiteAnalysisBackend(
+        os.getenv("ANALYSIS_STORE_PATH")
+        or os.path.join(os.path.dirname(__file__), ".cache", "analysis.sqlite3")
+    ),
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_analysis_store() -> AnalysisStore:
+    """Returns the process-wide analysis store, or None if ANALYSIS_STORE_BACKEND is "none"."""
+    global _store
+    name = os.getenv("ANALYSIS_STORE_BACKEND", "sqlite").lower()
+    if name == "none":
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = AnalysisStore(ANALYSIS_STORE_BACKENDS[name]())
+        return _store
+
+
+def restore_session_state(state, session_id: str, store: AnalysisStore) -> bool:
+    """
+    Fill a page's session state from the analysis store.
+
+    :param state: The Streamlit session state.
+    :param session_id: The session UID to resume.
+    :param store: The analysis store.
+    :return: True if a completed analysis was restored.
+    """
+    session = store.get_session(session_id)
+    analysis = store.get_analysis(session_id) if session else {}
+    if not analysis.get("rfp_summary") or not analysis.get("proposal_summary"):
+        return False
+
+    state.rfp_uploaded = True
+    state.rfp_file = None
+    state.vendor_uploaded = True
+    state.vendor_file = None
+    state.vendor_files = []
+    state.rfp_summary_ready = analysis["rfp_summary"]
+    state.vendor_summary_ready = analysis["proposal_summary"]
+    state.chat_ready = True
+    state.responses = session.get("responses", [])
+    return True
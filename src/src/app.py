@@ -1,9 +1,33 @@
+import asyncio
 import json
 import os
+import threading
+import time
 
 from jinja2 import Environment, FileSystemLoader
 from semantic_kernel import Kernel
+from semantic_kernel.agents import AgentGroupChat, ChatCompletionAgent
+from semantic_kernel.agents.strategies import (
+    KernelFunctionSelectionStrategy,
+    KernelFunctionTerminationStrategy,
+)
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.contents import AuthorRole, ChatHistoryTruncationReducer, ChatMessageContent
+from semantic_kernel.exceptions import AgentChatException
+from semantic_kernel.functions import KernelFunctionFromPrompt
+
+from plugins.legal_compliance_plugin import LegalCompliancePlugin
+from plugins.vendor_evaluation_plugin import VendorEvaluationPlugin
+from plugins.market_intelligence_plugin import MarketIntelligencePlugin
+from agent_dag import AgentDAG, user_message
+from context_budget import ContextBudgeter, ContextSection
+from history_reducer import SummarizingHistoryReducer
+from retrieval_cache import retrieval_cache
+from search_clients import search_with_fallback
+from strategies import EvaluationSelectionStrategy, EvaluationTerminationStrategy
+from tracing import record_span, span
+from vendor_name_index import get_match_threshold, get_vendor_name_index
 
 # Define agent names
 AGENT_NAMES = {
@@ -15,6 +39,57 @@ AGENT_NAMES = {
     "evaluation_report": "EvaluationReport",
 }
 
+# Fixed order in which the agents run during the initial evaluation
+EVALUATION_SEQUENCE = [
+    AGENT_NAMES["rfp_compliance"],
+    AGENT_NAMES["legal_compliance"],
+    AGENT_NAMES["vendor_evaluation"],
+    AGENT_NAMES["market_intelligence"],
+    AGENT_NAMES["negotiation_strategy"],
+    AGENT_NAMES["evaluation_report"],
+]
+
+# Agents each agent needs the answers of; the first four analyses are independent and run in parallel
+AGENT_DEPENDENCIES = {
+    AGENT_NAMES["rfp_compliance"]: [],
+    AGENT_NAMES["legal_compliance"]: [],
+    AGENT_NAMES["vendor_evaluation"]: [],
+    AGENT_NAMES["market_intelligence"]: [],
+    AGENT_NAMES["negotiation_strategy"]: [
+        AGENT_NAMES["rfp_compliance"],
+        AGENT_NAMES["legal_compliance"],
+        AGENT_NAMES["vendor_evaluation"],
+        AGENT_NAMES["market_intelligence"],
+    ],
+    AGENT_NAMES["evaluation_report"]: [
+        AGENT_NAMES["rfp_compliance"],
+        AGENT_NAMES["legal_compliance"],
+        AGENT_NAMES["vendor_evaluation"],
+        AGENT_NAMES["market_intelligence"],
+        AGENT_NAMES["negotiation_strategy"],
+    ],
+}
+
+# Keywords used to route follow-up questions to an agent
+FOLLOW_UP_INTENTS = {
+    AGENT_NAMES["rfp_compliance"]: ["requirement", "rfp", "scope", "deliverable", "gap", "mandatory", "alignment"],
+    AGENT_NAMES["legal_compliance"]: ["compliance", "legal", "regulat", "gdpr", "policy", "policies", "liabilit", "clause",
+                                      "contract term", "dispute resolution", "privacy", "iso 27001", "soc 2", "hipaa"],
+    AGENT_NAMES["vendor_evaluation"]: ["history", "reputation", "credib", "past client", "track record",
+                                       "financial stability", "customer satisfaction", "references"],
+    AGENT_NAMES["market_intelligence"]: ["industry", "trend", "market", "competitor", "supply chain", "regulatory change"],
+    AGENT_NAMES["negotiation_strategy"]: ["negotiat", "leverage", "discount", "pricing", "terms", "counteroffer", "mitigat"],
+    AGENT_NAMES["evaluation_report"]: ["report", "final score", "overall", "summary", "summarize", "recommend", "modif"],
+}
+
+# Text the final evaluation report is expected to contain
+REPORT_MARKERS = ["final score", "recommend"]
+
+# Industry used for market intelligence when none is detected in the RFP
+DEFAULT_INDUSTRY = "Cloud Computing"
+
+MARKET_INTELLIGENCE_DATASET = os.path.abspath(os.path.join(os.path.dirname(__file__), "documents", "market-intelligence.json"))
+
 # Function to create a kernel instance with an Azure OpenAI ChatCompletion service
 def create_kernel() -> Kernel:
     """Creates a Kernel instance with an Azure OpenAI ChatCompletion service."""
@@ -22,16 +97,372 @@ def create_kernel() -> Kernel:
     kernel.add_service(service=AzureChatCompletion())
     return kernel
 
+# Agent prompts rendered once per process from the Jinja template, re-rendered only when the template changes
+AGENT_PROMPTS_TEMPLATE = os.path.join(os.path.dirname(__file__), "agent_prompts.jinja")
+_agent_prompts = {"mtime": None, "prompts": {}}
+_agent_prompts_lock = threading.Lock()
+
+
 # Function to extract agent prompts
 def get_agent_prompts() -> dict:
-    """Loads agent prompts from a Jinja template."""
-    # Path to the directory of app.py
-    script_dir = os.path.dirname(__file__)
-    env = Environment(loader=FileSystemLoader(script_dir))
-    template = env.get_template("agent_prompts.jinja")
+    """Returns the agent prompts from the compiled Jinja template."""
+    mtime = os.path.getmtime(AGENT_PROMPTS_TEMPLATE)
+    with _agent_prompts_lock:
+        if _agent_prompts["mtime"] != mtime:
+            env = Environment(loader=FileSystemLoader(os.path.dirname(AGENT_PROMPTS_TEMPLATE)))
+            template = env.get_template(os.path.basename(AGENT_PROMPTS_TEMPLATE))
+            try:
+                _agent_prompts["prompts"] = json.loads(template.render())
+            except json.JSONDecodeError as e:
+                print(f"\n[ERROR] Jinja Prompt - JSON Parsing Failed: {e}")
+                _agent_prompts["prompts"] = {}
+            _agent_prompts["mtime"] = mtime
+        return dict(_agent_prompts["prompts"])
+
+# Function to retrieve the policy context for the Legal Compliance agent
+async def retrieve_policy_context(legal_summary: str) -> str:
+    """Retrieves the legal policies relevant to a legal summary."""
+    index_name = os.getenv("LEGAL_POLICY_INDEX")
+    with span("retrieve", kind="policy", index=index_name):
+        return await search_with_fallback(index_name, lambda search_client: LegalCompliancePlugin(
+            search_client=search_client,
+            vendor_legal_summary=legal_summary,
+            index_name=index_name,
+            cache=retrieval_cache,
+        ).check_compliance())
+
+
+# Function to retrieve the historical insights for the Vendor Evaluation agent
+async def retrieve_vendor_insights(vendor_name: str) -> str:
+    """Retrieves historical insights about a vendor."""
+    index_name = os.getenv("SUPPLIER_INDEX")
+    with span("retrieve", kind="vendor", index=index_name):
+        return await search_with_fallback(index_name, lambda search_client: VendorEvaluationPlugin(
+            search_client=search_client,
+            vendor_name=vendor_name,
+            index_name=index_name,
+            cache=retrieval_cache,
+            name_index=get_vendor_name_index(),
+            match_threshold=get_match_threshold(),
+        ).get_vendor_insights())
+
+
+# Function to look up the insights for the Market Intelligence agent
+def get_market_insights(industry: str = None, rfp_summary: str = "") -> str:
+    """Looks up market intelligence insights for an industry, or for the industries detected in the RFP summary."""
+    market_intelligence_plugin = MarketIntelligencePlugin(MARKET_INTELLIGENCE_DATASET)
+    industries = [industry] if industry else market_intelligence_plugin.detect_industries(str(rfp_summary)) or [DEFAULT_INDUSTRY]
+    return "\n".join(market_intelligence_plugin.get_market_insights(name) for name in industries)
+
+
+# Token budget of each agent's instructions; agents not listed get AGENT_CONTEXT_TOKENS
+AGENT_CONTEXT_BUDGETS = {
+    AGENT_NAMES["rfp_compliance"]: int(os.getenv("RFP_COMPLIANCE_CONTEXT_TOKENS", "12000")),
+}
+
+context_budgeter = ContextBudgeter(AGENT_CONTEXT_BUDGETS, int(os.getenv("AGENT_CONTEXT_TOKENS", "6000")))
+
+# Function to create the history reducer of the group chat
+def create_history_reducer(kernel: Kernel) -> SummarizingHistoryReducer:
+    """Creates the token-bounded history reducer that summarizes older turns and pins the evaluation report."""
+    return SummarizingHistoryReducer(
+        service=kernel.get_service(type=ChatCompletionClientBase),
+        target_count=int(os.getenv("HISTORY_RECENT_MESSAGES", "6")),
+        # Summarize in batches rather than on every turn once the history is long
+        threshold_count=int(os.getenv("HISTORY_REDUCE_THRESHOLD", "4")),
+        token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "8000")),
+        summary_max_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "600")),
+        pinned_agents=[AGENT_NAMES["evaluation_report"]],
+        tokenizer=context_budgeter.tokenizer,
+    )
+
+# Function to create the evaluation agents
+def create_agents(kernel: Kernel, prompt_instructions: dict, rfp_summary, proposal_summary: dict,
+                  policy_context: str, vendor_insights: str, market_insights: str) -> dict:
+    """Creates the evaluation agents keyed like AGENT_NAMES, with their budgeted context after the static prompt."""
+    # Sections run from the most to the least shared so evaluations of one RFP share the longest prompt prefix
+    legal_summary = proposal_summary.get('legal_summary', '')
+    sections = {
+        "rfp_compliance": [
+            ContextSection("RFP Summary", str(rfp_summary)),
+            ContextSection("Proposal Summary", proposal_summary.get('overall_summary', 'No overall summary provided.')),
+        ],
+        "legal_compliance": [
+            ContextSection("Retrieved Policy Context", policy_context, query=legal_summary),
+            ContextSection("Vendor Legal Summary", legal_summary),
+        ],
+        "vendor_evaluation": [ContextSection("Vendor Insights", vendor_insights)],
+        "market_intelligence": [ContextSection("Market Insights", market_insights)],
+        "negotiation_strategy": [],
+        "evaluation_report": [],
+    }
+    return {
+        key: ChatCompletionAgent(
+            kernel=kernel,
+            name=AGENT_NAMES[key],
+            instructions=context_budgeter.build(AGENT_NAMES[key], prompt_instructions[key], agent_sections),
+        )
+        for key, agent_sections in sections.items()
+    }
+
+
+# Function to create the group chat that orchestrates the agents
+def create_group_chat(kernel: Kernel, agents: dict) -> AgentGroupChat:
+    """Creates the AgentGroupChat with its selection and termination strategies."""
+    # Define a selection function to determine which agent should take the next turn.
+    selection_function = KernelFunctionFromPrompt(
+    function_name="selection",
+    prompt=f"""
+    You are responsible for selecting the next agent in the workflow.
+    Examine the provided RESPONSE and choose the next participant.
+    State only the name of the chosen participant without explanation.
+    Never choose the participant named in the RESPONSE.
+
+    ### Rules:
+    - If the user has just started, follow this strict sequence:
+      1. First, call {AGENT_NAMES["rfp_compliance"]}.
+      2. Next, call {AGENT_NAMES["legal_compliance"]}.
+      3. Then, call {AGENT_NAMES["vendor_evaluation"]}.
+      4. Then, call {AGENT_NAMES["market_intelligence"]}.
+      5. Then, call {AGENT_NAMES["negotiation_strategy"]}.
+      6. Finally, call {AGENT_NAMES["evaluation_report"]}.
+    - **Do NOT skip any agent in the sequence.**
+    - **Each agent runs exactly ONCE but AT LEAST once during evaluation.**
     
-    try:
-        return json.loads(template.render())
-    except json.JSONDecodeError as e:
-        print(f"\n[ERROR] Jinja Prompt - JSON Parsing Failed: {e}")
-        return {}
\ No newline at end of file
+    - After the full evaluation is complete:
+      - If the user asks about **compliance issues**, select {AGENT_NAMES["legal_compliance"]}.
+      - If the user asks about **vendor history, reputation, or credibility**, select {AGENT_NAMES["vendor_evaluation"]}.
+      - If the user asks about **industry insights or trends**, select {AGENT_NAMES["market_intelligence"]}.
+      - If the user asks about **negotiation recommendations**, select {AGENT_NAMES["negotiation_strategy"]}.
+      - If the user asks about **the final report or modifications**, select {AGENT_NAMES["evaluation_report"]}.
+      - If unsure, default to {AGENT_NAMES["evaluation_report"]}.
+
+    RESPONSE:
+    {{{{$lastmessage}}}}
+    """,
+    )
+
+    # Define a termination function where the final agent signals completion.
+    termination_keyword = "yes"
+    termination_function = KernelFunctionFromPrompt(
+        function_name="termination",
+        prompt=f"""
+       If all checks and evaluations are completed, respond 'yes'. Otherwise, respond 'no'.
+
+        RESPONSE:
+        {{{{$lastmessage}}}}
+        """,
+    )
+
+    history_reducer = ChatHistoryTruncationReducer(target_count=10)
+
+    # The fixed sequence is walked locally; the LLM is only asked about ambiguous follow-up questions
+    llm_selection_strategy = KernelFunctionSelectionStrategy(
+        function=selection_function,
+        kernel=kernel,
+        result_parser=lambda result: (
+            next(
+                (agent for agent in AGENT_NAMES.values() if agent.lower() == str(result.value[0]).strip().lower()),
+                AGENT_NAMES["evaluation_report"],
+                )
+            ),
+        history_variable_name="lastmessage",
+        history_reducer=history_reducer,
+    )
+    use_llm_fallback = os.getenv("SELECTION_LLM_FALLBACK", "true").lower() == "true"
+
+    # Termination is decided locally; the yes/no prompt is an optional fallback for reports without the expected markers
+    llm_termination_strategy = KernelFunctionTerminationStrategy(
+        agents=[agents["evaluation_report"]],
+        function=termination_function,
+        kernel=kernel,
+        result_parser=lambda result: termination_keyword in str(result.value[0]).strip().lower(),
+        history_variable_name="lastmessage",
+        maximum_iterations=6,
+        history_reducer=history_reducer,
+    )
+    use_termination_llm_fallback = os.getenv("TERMINATION_LLM_FALLBACK", "false").lower() == "true"
+
+    # Create the AgentGroupChat with selection and termination strategies.
+    return AgentGroupChat(
+        agents=[agents["rfp_compliance"], agents["legal_compliance"], agents["vendor_evaluation"], agents["evaluation_report"], agents["market_intelligence"], agents["negotiation_strategy"]],
+        selection_strategy=EvaluationSelectionStrategy(
+            sequence=EVALUATION_SEQUENCE,
+            intent_keywords=FOLLOW_UP_INTENTS,
+            default_agent=AGENT_NAMES["evaluation_report"],
+            fallback=llm_selection_strategy if use_llm_fallback else None,
+        ),
+        termination_strategy=EvaluationTerminationStrategy(
+            sequence=EVALUATION_SEQUENCE,
+            report_agent=AGENT_NAMES["evaluation_report"],
+            report_markers=REPORT_MARKERS,
+            fallback=llm_termination_strategy if use_termination_llm_fallback else None,
+            maximum_iterations=6,
+            automatic_reset=True,
+        ),
+        # The shared history every agent reads; invoke_chat reduces it before each user message
+        chat_history=create_history_reducer(kernel),
+    )
+
+
+# Function to initialize the chat system outside of any UI
+async def initialize_chat(rfp_summary, proposal_summary: dict, kernel: Kernel = None, prompt_instructions: dict = None,
+                          policy_context: str = None, market_insights: str = None,
+                          vendor_insights: str = None) -> AgentGroupChat:
+    """
+    Builds the agent group chat for one RFP and vendor proposal.
+
+    Context that is already known, such as the kernel, prompts, policy context or market insights,
+    can be passed in so it is not recomputed for every vendor or when a stored session is resumed.
+    """
+    kernel = kernel or create_kernel()
+    prompt_instructions = prompt_instructions or get_agent_prompts()
+    context = await retrieve_context(rfp_summary, proposal_summary, policy_context, vendor_insights, market_insights)
+
+    agents = create_agents(kernel, prompt_instructions, rfp_summary, proposal_summary, **context)
+    return create_group_chat(kernel, agents)
+
+
+# Function to retrieve the context of the evaluation agents
+async def retrieve_context(rfp_summary, proposal_summary: dict, policy_context: str = None, vendor_insights: str = None,
+                           market_insights: str = None) -> dict:
+    """Retrieves the policy context, vendor insights and market insights that are not already known."""
+    # Policy, vendor and market retrieval are independent and run concurrently
+    async def _known(value):
+        return value
+
+    policy_context, vendor_insights, market_insights = await asyncio.gather(
+        retrieve_policy_context(proposal_summary.get("legal_summary", "")) if policy_context is None else _known(policy_context),
+        retrieve_vendor_insights(proposal_summary.get("vendor_name", "Unknown Vendor")) if vendor_insights is None else _known(vendor_insights),
+        _known(get_market_insights(rfp_summary=rfp_summary) if market_insights is None else market_insights),
+    )
+    return {"policy_context": policy_context, "vendor_insights": vendor_insights, "market_insights": market_insights}
+
+
+# Function to replay a stored transcript into a new chat
+async def restore_history(chat: AgentGroupChat, responses: list):
+    """Adds stored UI messages, dicts with "role" and "content", to the chat history without invoking any agent."""
+    await chat.add_chat_messages([
+        ChatMessageContent(role=AuthorRole.USER, content=response["content"]) if response["role"] == "user"
+        else ChatMessageContent(role=AuthorRole.ASSISTANT, name=response["role"], content=response["content"])
+        for response in responses
+    ])
+
+
+async def reduce_chat_history(chat: AgentGroupChat) -> bool:
+    """Folds older turns into the running summary once the chat history is over its message or token budget."""
+    with span("reduce_history", messages=len(chat.history.messages)) as current:
+        reduced = await chat.reduce_history()
+        current.set("reduced", reduced)
+        if reduced:
+            print(f"[history] reduced the chat history to {len(chat.history.messages)} messages")
+        return reduced
+
+
+def _use_dag(chat: AgentGroupChat) -> bool:
+    """Whether the next user message should run the initial evaluation as a dependency graph."""
+    evaluated = AGENT_NAMES["evaluation_report"] in [message.name for message in chat.history.messages]
+    return not evaluated and os.getenv("AGENT_ORCHESTRATION", "dag").lower() == "dag"
+
+
+def _usage_attributes(usage) -> dict:
+    """Span attributes for the token usage of an agent response."""
+    if usage is None:
+        return {}
+    values = {field: usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+              for field in ("prompt_tokens", "completion_tokens")}
+    return {field: value for field, value in values.items() if value is not None}
+
+
+def _create_dag(chat: AgentGroupChat) -> AgentDAG:
+    return AgentDAG({agent.name: agent for agent in chat.agents}, AGENT_DEPENDENCIES, EVALUATION_SEQUENCE)
+
+
+# Function to send a user message to the chat and get back the agent responses
+async def invoke_chat(chat: AgentGroupChat, prompt: str):
+    """
+    Adds a user message to the chat and yields the agent responses.
+
+    While the evaluation has not run yet and AGENT_ORCHESTRATION is "dag", the agents run as a
+    dependency graph and their responses are added to the chat history afterwards, so follow-up
+    questions are handled by the group chat as usual.
+    """
+    await reduce_chat_history(chat)
+    if not _use_dag(chat):
+        await chat.add_chat_message(message=prompt)
+        turn_started = time.time_ns()
+        async for response in chat.invoke():
+            record_span("agent_turn", turn_started, agent=response.name, orchestration="group_chat",
+                        **_usage_attributes(response.metadata.get("usage")))
+            yield response
+            turn_started = time.time_ns()
+        return
+
+    message = user_message(prompt)
+    responses = []
+    async for response in _create_dag(chat).run(message):
+        responses.append(response)
+        yield response
+    await chat.add_chat_messages([message, *responses])
+
+
+async def _stream_group_chat(chat: AgentGroupChat, ttft: dict = None):
+    """
+    Runs the group chat for the latest user message and yields (agent name, token) pairs.
+
+    AgentGroupChat.invoke_stream never adds the streamed replies to the chat history, so every turn
+    would select the first agent again. The chat's selection and termination strategies are applied
+    here instead, and each reply is added to the history once its agent has finished.
+    """
+    if chat.is_complete:
+        if not chat.termination_strategy.automatic_reset:
+            raise AgentChatException("Chat is already complete")
+        chat.is_complete = False
+
+    for _ in range(chat.termination_strategy.maximum_iterations):
+        agent = await chat.selection_strategy.next(chat.agents, chat.history.messages)
+        turn_started = time.time_ns()
+        started = time.perf_counter()
+        attributes = {"agent": agent.name, "orchestration": "group_chat", "streaming": True}
+        parts = []
+        async for response in agent.invoke_stream(messages=list(chat.history.messages)):
+            attributes.update(_usage_attributes(response.metadata.get("usage")))
+            token = response.message.content
+            if token:
+                if not parts:
+                    attributes["ttft_ms"] = (time.perf_counter() - started) * 1000
+                    if ttft is not None:
+                        ttft[agent.name] = time.perf_counter() - started
+                parts.append(token)
+                yield agent.name, token
+        record_span("agent_turn", turn_started, **attributes)
+
+        await chat.add_chat_message(ChatMessageContent(role=AuthorRole.ASSISTANT, name=agent.name, content="".join(parts)))
+        chat.is_complete = await chat.termination_strategy.should_terminate(agent, chat.history.messages)
+        if chat.is_complete:
+            break
+
+
+# Function to send a user message to the chat and stream back the agent tokens
+async def invoke_chat_stream(chat: AgentGroupChat, prompt: str, ttft: dict = None):
+    """
+    Adds a user message to the chat and yields (agent name, token) pairs as the agents generate them.
+
+    Follows the same orchestration as invoke_chat. Each agent's time to first token, in seconds,
+    is written to ttft when given.
+    """
+    await reduce_chat_history(chat)
+    if not _use_dag(chat):
+        await chat.add_chat_message(message=prompt)
+        async for name, token in _stream_group_chat(chat, ttft):
+            yield name, token
+        return
+
+    message = user_message(prompt)
+    parts = {}
+    async for name, token in _create_dag(chat).run_stream(message, ttft):
+        parts.setdefault(name, []).append(token)
+        yield name, token
+
+    responses = [ChatMessageContent(role=AuthorRole.ASSISTANT, name=name, content="".join(tokens)) for name, tokens in parts.items()]
+    await chat.add_chat_messages([message, *responses])
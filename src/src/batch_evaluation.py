@@ -0,0 +1,153 @@
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app import (
+    AGENT_NAMES,
+    create_kernel,
+    get_agent_prompts,
+    get_market_insights,
+    initialize_chat,
+    invoke_chat,
+    retrieve_policy_context,
+)
+from doc_summarization import summarize_document
+
+# Message that kicks off the evaluation of each proposal
+EVALUATION_REQUEST = "Evaluate the vendor proposal against the RFP and produce the final evaluation report."
+
+# Scores and ratings pulled out of the agent reports for the comparison table
+_SCORE_PATTERNS = {
+    "final_score": (AGENT_NAMES["evaluation_report"], r"final\s+score\W*(\d+(?:\.\d+)?)"),
+    "rfp_compliance_score": (AGENT_NAMES["rfp_compliance"], r"score\W*(\d+(?:\.\d+)?)"),
+    "vendor_reputation_score": (AGENT_NAMES["vendor_evaluation"], r"score\W*(\d+(?:\.\d+)?)"),
+    "legal_risk": (AGENT_NAMES["legal_compliance"], r"\b(low|medium|high)\b[^\n]{0,20}risk"),
+    "market_risk": (AGENT_NAMES["market_intelligence"], r"\b(low|medium|high)\b[^\n]{0,20}risk"),
+    "negotiation_approach": (AGENT_NAMES["negotiation_strategy"], r"\b(defensive|balanced|aggressive)\b"),
+}
+
+
+def _legal_requirements(rfp_summary: str) -> str:
+    """Extract the Legal & Compliance section of an RFP summary, falling back to the whole summary."""
+    match = re.search(r"^#+\s*\**\s*legal[^\n]*\n(.*?)(?=^#{1,3}\s|\Z)", rfp_summary, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    return match.group(1).strip() if match and match.group(1).strip() else rfp_summary
+
+
+def extract_scores(responses: list) -> dict:
+    """
+    Pull the scores and ratings out of the agent responses of one evaluation.
+
+    :param responses: Agent responses as {"role", "content"} dicts.
+    :return: Score and rating per column of the comparison table, None where not found.
+    """
+    scores = {}
+    for column, (agent_name, pattern) in _SCORE_PATTERNS.items():
+        content = next((r["content"] for r in reversed(responses) if r["role"] == agent_name), "")
+        match = re.search(pattern, content, re.IGNORECASE)
+        if not match:
+            scores[column] = None
+        elif column.endswith("_score"):
+            scores[column] = float(match.group(1))
+        else:
+            scores[column] = match.group(1).capitalize()
+    return scores
+
+
+def rank_results(results: list) -> list:
+    """
+    Rank evaluated vendors by their final score, best first.
+
+    :param results: Per-proposal results returned by evaluate_proposals.
+    :return: Comparison table rows with a rank column.
+    """
+    rows = [{"vendor_name": result["vendor_name"], **result["scores"]} for result in results]
+    rows.sort(key=lambda row: row["final_score"] if row["final_score"] is not None else float("-inf"), reverse=True)
+    return [{"rank": rank, **row} for rank, row in enumerate(rows, start=1)]
+
+
+async def _run_evaluation(chat) -> list:
+    """Run the agent group chat to completion and collect the agent responses."""
+    responses = []
+    async for response in invoke_chat(chat, EVALUATION_REQUEST):
+        if response and response.name:
+            responses.append({"role": response.name.strip(), "content": response.content})
+    return responses
+
+
+async def evaluate_proposals(rfp_file, vendor_files: list, max_workers: int = None, max_concurrent_evaluations: int = None,
+                             summary_concurrency: int = None, progress=None) -> dict:
+    """
+    Evaluate several vendor proposals against one RFP.
+
+    The RFP is summarized once and the proposals are summarized on a bounded worker pool. Shared
+    context (kernel, agent prompts, policy retrieval and market insights) is computed once and reused,
+    then the agent evaluation runs concurrently for every vendor.
+
+    :param rfp_file: File object of the RFP document.
+    :param vendor_files: File objects of the vendor proposals.
+    :param max_workers: Size of the summarization worker pool.
+    :param max_concurrent_evaluations: Number of agent evaluations run at the same time.
+    :param summary_concurrency: Number of concurrent chunk summaries within each document.
+    :param progress: Optional callable receiving a status message after each step.
+    :return: The RFP summary, the wall-clock seconds spent per stage and, in upload order, one result
+        per proposal with its summary, agent responses and extracted scores.
+    """
+    max_workers = max_workers or int(os.getenv("BATCH_MAX_WORKERS", "4"))
+    max_concurrent_evaluations = max_concurrent_evaluations or int(os.getenv("BATCH_MAX_CONCURRENT_EVALUATIONS", "4"))
+    report = progress or (lambda message: None)
+    loop = asyncio.get_running_loop()
+    summarize = partial(summarize_document, max_concurrency=summary_concurrency)
+    timings = {}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-summarize") as executor:
+        rfp_future = loop.run_in_executor(executor, summarize, rfp_file, "rfp")
+        proposal_futures = [loop.run_in_executor(executor, summarize, vendor_file, "proposal")
+                            for vendor_file in vendor_files]
+
+        rfp_summary = await rfp_future
+        timings["summarize_rfp"] = time.perf_counter() - started
+        report("RFP summarized")
+
+        # Shared context is prepared while the proposals are still being summarized
+        stage_started = time.perf_counter()
+        kernel = create_kernel()
+        prompt_instructions = get_agent_prompts()
+        policy_context = await retrieve_policy_context(_legal_requirements(rfp_summary))
+        market_insights = get_market_insights(rfp_summary=rfp_summary)
+        timings["shared_context"] = time.perf_counter() - stage_started
+        report("Shared policy and market context retrieved")
+
+        proposal_summaries = []
+        for future in proposal_futures:
+            proposal_summaries.append(await future)
+            report(f"Proposal summarized: {proposal_summaries[-1]['vendor_name']}")
+        # Proposals start with the RFP, so this is measured from the start of the batch
+        timings["summarize_proposals"] = time.perf_counter() - started
+
+    semaphore = asyncio.Semaphore(max_concurrent_evaluations)
+
+    async def _evaluate(proposal_summary):
+        async with semaphore:
+            evaluation_started = time.perf_counter()
+            chat = await initialize_chat(rfp_summary, proposal_summary, kernel=kernel, prompt_instructions=prompt_instructions,
+                                         policy_context=policy_context, market_insights=market_insights)
+            responses = await _run_evaluation(chat)
+            duration = time.perf_counter() - evaluation_started
+        report(f"Evaluation completed: {proposal_summary['vendor_name']}")
+        return {
+            "vendor_name": proposal_summary["vendor_name"],
+            "proposal_summary": proposal_summary,
+            "responses": responses,
+            "scores": extract_scores(responses),
+            "duration": duration,
+        }
+
+    stage_started = time.perf_counter()
+    results = await asyncio.gather(*(_evaluate(proposal_summary) for proposal_summary in proposal_summaries))
+    timings["evaluate"] = time.perf_counter() - stage_started
+    timings["total"] = time.perf_counter() - started
+    return {"rfp_summary": rfp_summary, "timings": timings, "results": list(results)}
@@ -0,0 +1,441 @@
+"""
+Offline end-to-end benchmark of the RFP analysis pipeline.
+
+Drives the real summarization, chat initialization and agent evaluation code against the
+latency-simulating Azure OpenAI, Document Intelligence and AI Search services of benchmark_fakes.py,
+over the sample documents and synthetic documents of the given page counts. The fakes are served to
+the real SDK clients as HTTP transports, so throttled requests go through the SDK retry policies and
+the retry hooks of the pipeline. Reports p50/p95 latency per stage, LLM calls, prompt/completion
+tokens, 429 responses and the retries counted on the trace spans, and the cold-start import time of
+the pipeline modules in fresh interpreters:
+
+    python benchmark.py --iterations 5 --pages 50 300 --output benchmark-report.json
+    python benchmark.py --save-baseline                           # record benchmark-baseline.json
+    python benchmark.py --baseline benchmark-baseline.json        # exit code 1 on regressions
+"""
+import argparse
+import asyncio
+import functools
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+SAMPLE_DOCS = os.path.join(os.path.dirname(__file__), "documents", "sample-docs")
+SUPPLIER_DATASET = os.path.join(SAMPLE_DOCS, "index-creation", "supplier-insights-index", "Historical-Vendor-Insights.json")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "benchmark-baseline.json")
+
+# Modules whose import time in a fresh interpreter is measured as the cold-start cost
+STARTUP_MODULES = ["doc_summarization", "app", "batch_evaluation"]
+
+STAGES = ["summarize_rfp", "summarize_proposal", "initialize_chat", "evaluate", "follow_up"]
+FOLLOW_UP_QUESTION = "What are the main legal risks in this proposal?"
+WORDS_PER_PAGE = 500
+
+# Service settings the pipeline reads when creating clients; their requests are answered by the fake services
+_PLACEHOLDER_ENVIRONMENT = {
+    "AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT": "https://benchmark.invalid",
+    "AZURE_DOC_INTELLIGENCE_KEY": "benchmark",
+    "AZURE_OPENAI_ENDPOINT": "https://benchmark.invalid",
+    "AZURE_OPENAI_API_KEY": "benchmark",
+    "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME": "benchmark",
+    "AZURE_AI_SEARCH_ENDPOINT": "https://benchmark.invalid",
+    "AZURE_AI_SEARCH_API_KEY": "benchmark",
+    "LEGAL_POLICY_INDEX": "legal-policy-index",
+    "SUPPLIER_INDEX": "supplier-insights-index",
+    # The fake supplier index serves the sample dataset, so the name index is built from the same records
+    "SUPPLIER_INSIGHTS_DATASET": SUPPLIER_DATASET,
+}
+
+_VOCABULARY = ("service level availability support migration security compliance data privacy encryption "
+               "pricing license term renewal liability indemnity warranty termination audit reporting "
+               "implementation timeline milestone acceptance training onboarding escalation incident "
+               "backup recovery capacity integration interoperability governance certification").split()
+
+
+def synthetic_document(pages: int, title: str, seed: int = 0) -> str:
+    """Generate a Markdown document of roughly the given number of pages with headings, paragraphs and tables."""
+    rng = random.Random(seed)
+    blocks = [f"# {title}"]
+    for page in range(pages):
+        if page % 2 == 0:
+            blocks.append(f"## Section {page // 2 + 1}: {rng.choice(_VOCABULARY).title()} Requirements")
+        words = WORDS_PER_PAGE
+        if page % 5 == 4:
+            rows = [f"| {rng.choice(_VOCABULARY)} | {rng.randint(1, 99)} | {rng.choice(_VOCABULARY)} |" for _ in range(8)]
+            blocks.append("\n".join(["| Item | Value | Notes |", "| --- | --- | --- |", *rows]))
+            words -= 60
+        for _ in range(4):
+            sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(words // 4))
+            blocks.append(sentence.capitalize() + ".")
+    return "\n\n".join(blocks)
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Linearly interpolated percentile of a list of numbers."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def measure_startup(modules: list, runs: int) -> dict:
+    """Time the import of each module in fresh interpreters, returning p50/p95 seconds per module."""
+    code = ("import importlib, sys, time; started = time.perf_counter(); "
+            "importlib.import_module(sys.argv[1]); print(time.perf_counter() - started)")
+    startup = {}
+    for module in modules:
+        seconds = []
+        for _ in range(runs):
+            result = subprocess.run([sys.executable, "-c", code, module], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"  Importing {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+                break
+            seconds.append(float(result.stdout.strip().splitlines()[-1]))
+        if seconds:
+            startup[module] = {"p50": percentile(seconds, 0.5), "p95": percentile(seconds, 0.95)}
+    return startup
+
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta: float = 0.05) -> list:
+    """
+    List the stages whose p95 latency, LLM calls or tokens, and the modules whose p95 import time, exceed the baseline by more than the tolerance.
+
+    Latencies must also exceed the baseline by min_delta seconds, so scheduler noise on stages of a few
+    milliseconds is not reported.
+    """
+    regressions = []
+    for module, base in baseline.get("startup", {}).items():
+        measured = report.get("startup", {}).get(module)
+        if measured is not None and measured["p95"] > base["p95"] * (1 + tolerance) and measured["p95"] - base["p95"] > min_delta:
+            regressions.append(f"startup/{module}: p95 {measured['p95']:.3f} vs baseline {base['p95']:.3f}")
+    for name, expected in baseline["documents"].items():
+        current = report["documents"].get(name)
+        if current is None:
+            continue
+        for stage, base in expected["stages"].items():
+            measured = current["stages"].get(stage)
+            if measured is None:
+                continue
+            for metric in ("p95", "llm_calls", "prompt_tokens", "completion_tokens"):
+                slack = min_delta if metric == "p95" else 1e-3
+                if measured[metric] > base[metric] * (1 + tolerance) and measured[metric] - base[metric] > slack:
+                    regressions.append(f"{name}/{stage}: {metric} {measured[metric]:.3f} vs baseline {base[metric]:.3f}")
+    return regressions
+
+
+class BenchmarkHarness:
+    """
+    Runs the pipeline against the fake services and collects per-stage measurements.
+    """
+
+    def __init__(self, args):
+        """
+        Patch the pipeline modules to use the fake services.
+
+        :param args: Parsed command-line arguments with the latency settings.
+        """
+        for name, value in _PLACEHOLDER_ENVIRONMENT.items():
+            os.environ.setdefault(name, value)
+        os.environ["SEARCH_BACKEND"] = "azure"
+        # The synthetic text documents stand in for PDFs and go through the simulated Document Intelligence,
+        # while the .docx samples are extracted locally as in production
+        os.environ.setdefault("DOCUMENT_ROUTING", "txt=document_intelligence")
+        self.scratch = tempfile.TemporaryDirectory(prefix="rfp-benchmark-")
+        # The analysis store and caches must start empty so every run does the full work
+        os.environ["ANALYSIS_STORE_BACKEND"] = "none"
+
+        # Retries are read back from the trace spans the pipeline's retry hooks count them on
+        os.environ["TRACING_ENABLED"] = "true"
+        os.environ["TRACE_JSONL_PATH"] = os.path.join(self.scratch.name, "trace.jsonl")
+        self._trace_offset = 0
+
+        import app
+        import batch_evaluation
+        import doc_summarization
+        import openai
+        import search_clients
+        from benchmark_fakes import FakeAzureOpenAI, FakeDocumentIntelligence, FakeSearchService, LatencyProfile, ServiceStats
+        from chunking import get_tokenizer
+        from semantic_kernel import Kernel
+
+        self.app = app
+        self.doc_summarization = doc_summarization
+        self.evaluation_request = batch_evaluation.EVALUATION_REQUEST
+        tokenizer = get_tokenizer()
+
+        def profile(prefix, seed_offset):
+            return LatencyProfile(latency_ms=getattr(args, f"{prefix}_latency_ms"),
+                                  jitter_ms=getattr(args, f"{prefix}_jitter_ms"),
+                                  tokens_per_second=getattr(args, f"{prefix}_tokens_per_second", 0.0),
+                                  throttle_rate=getattr(args, f"{prefix}_throttle_rate"),
+                                  time_scale=args.time_scale, seed=args.seed + seed_offset)
+
+        self.stats = {"summarization": ServiceStats(), "agents": ServiceStats(),
+                      "document_intelligence": ServiceStats(), "search": ServiceStats()}
+
+        with open(SUPPLIER_DATASET, "r", encoding="utf-8") as file:
+            suppliers = [{"chunk": record["vendor_name"], **record} for record in json.load(file)]
+
+        # Azure OpenAI for summarization: the pipeline creates its own client, whose HTTP client gets the fake transport.
+        # The proposals are attributed to a vendor of the supplier dataset so the vendor name index finds it.
+        summarization = FakeAzureOpenAI(profile("llm", 0), self.stats["summarization"], args.llm_completion_tokens,
+                                        vendor_name=suppliers[0]["vendor_name"], tokenizer=tokenizer)
+        openai.DefaultAsyncHttpxClient = functools.partial(openai.DefaultAsyncHttpxClient, transport=summarization.transport())
+
+        # Document Intelligence
+        self.document_intelligence = FakeDocumentIntelligence(profile("di", 1), self.stats["document_intelligence"],
+                                                              page_ms=args.di_page_ms)
+        document_intelligence_client = self.document_intelligence.create_client()
+        doc_summarization.get_document_intelligence_client = lambda: document_intelligence_client
+        # The synthetic documents are not PDFs; their registered page counts decide whether they are analyzed in page ranges
+        doc_summarization.count_pages = lambda document, document_type: self.document_intelligence.page_count(document)
+
+        # AI Search
+        policies = [{"chunk": synthetic_document(1, f"Policy {index}", seed=index)} for index in range(5)]
+        search_service = FakeSearchService(profile("search", 2), self.stats["search"], {
+            os.environ["LEGAL_POLICY_INDEX"]: policies,
+            os.environ["SUPPLIER_INDEX"]: suppliers,
+        })
+        search = {index_name: search_service.create_client(index_name) for index_name in search_service.indexes}
+        search_clients.get_search_client = lambda index_name: search[index_name]
+        search_clients.get_local_search_client = lambda index_name: search[index_name]
+
+        # Azure OpenAI for the agents
+        agents = FakeAzureOpenAI(profile("llm", 3), self.stats["agents"], args.agent_completion_tokens,
+                                 vendor_name=suppliers[0]["vendor_name"], tokenizer=tokenizer)
+
+        def create_kernel():
+            kernel = Kernel()
+            kernel.add_service(agents.create_chat_completion())
+            return kernel
+
+        app.create_kernel = create_kernel
+
+    def _reset_caches(self, iteration_dir: str):
+        """Point the layout and summary caches at an empty directory and clear the retrieval cache."""
+        from layout_cache import LayoutCache
+        from retrieval_cache import retrieval_cache
+        from summary_cache import SummaryCache
+
+        self.doc_summarization._layout_cache = LayoutCache(os.path.join(iteration_dir, "layout"), 256 * 1024 * 1024)
+        self.doc_summarization._summary_cache = SummaryCache(os.path.join(iteration_dir, "summaries.sqlite3"), 0, 5000)
+        retrieval_cache.invalidate()
+
+    def _snapshot(self) -> dict:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def _traced_retries(self, trace_id: str) -> int:
+        """Sum the retries counted on the spans of a trace written since the last call."""
+        path = os.environ["TRACE_JSONL_PATH"]
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as file:
+            file.seek(self._trace_offset)
+            lines = file.read()
+            self._trace_offset = file.tell()
+        records = [json.loads(line) for line in lines.splitlines() if line]
+        return sum(record["attributes"].get("retries", 0) for record in records if record["trace_id"] == trace_id)
+
+    async def run_iteration(self, rfp: bytes, proposal: bytes, iteration_dir: str) -> dict:
+        """
+        Run every stage once for an RFP and a proposal.
+
+        :param rfp: RFP document bytes.
+        :param proposal: Proposal document bytes.
+        :param iteration_dir: Empty directory for the caches of this run.
+        :return: Seconds, LLM calls, tokens, throttled requests and retries per stage.
+        """
+        from tracing import span
+
+        self._reset_caches(iteration_dir)
+        stages = {}
+
+        async def measure(stage, awaitable):
+            before = self._snapshot()
+            started = time.perf_counter()
+            with span("benchmark_stage", stage=stage) as current:
+                result = await awaitable
+            seconds = time.perf_counter() - started
+            after = self._snapshot()
+            llm = [after[name][metric] - before[name][metric]
+                   for name in ("summarization", "agents") for metric in ("calls", "prompt_tokens", "completion_tokens")]
+            stages[stage] = {
+                "seconds": seconds,
+                "llm_calls": llm[0] + llm[3],
+                "prompt_tokens": llm[1] + llm[4],
+                "completion_tokens": llm[2] + llm[5],
+                "throttled": sum(after[name]["throttled"] - before[name]["throttled"] for name in after),
+                "retries": self._traced_retries(current.trace_id),
+            }
+            return result
+
+        async def collect(responses):
+            return [response async for response in responses]
+
+        rfp_summary = await measure("summarize_rfp", self.doc_summarization.summarize_document_async(io.BytesIO(rfp), "rfp"))
+        proposal_summary = await measure("summarize_proposal",
+                                         self.doc_summarization.summarize_document_async(io.BytesIO(proposal), "proposal"))
+        chat = await measure("initialize_chat", self.app.initialize_chat(rfp_summary, proposal_summary))
+        await measure("evaluate", collect(self.app.invoke_chat(chat, self.evaluation_request)))
+        await measure("follow_up", collect(self.app.invoke_chat(chat, FOLLOW_UP_QUESTION)))
+        return stages
+
+    async def run_document_set(self, name: str, rfp: bytes, proposal: bytes, iterations: int) -> dict:
+        """
+        Benchmark one RFP and proposal pair.
+
+        :param name: Name of the document set in the report.
+        :param rfp: RFP document bytes.
+        :param proposal: Proposal document bytes.
+        :param iterations: Number of runs.
+        :return: p50/p95 seconds, LLM calls, tokens, throttled requests and retries per stage.
+        """
+        runs = []
+        for iteration in range(iterations):
+            iteration_dir = os.path.join(self.scratch.name, f"{name}-{iteration}")
+            runs.append(await self.run_iteration(rfp, proposal, iteration_dir))
+            print(f"  {name}: run {iteration + 1}/{iterations} took {sum(stage['seconds'] for stage in runs[-1].values()):.2f}s")
+
+        stages = {}
+        for stage in STAGES:
+            seconds = [run[stage]["seconds"] for run in runs]
+            stages[stage] = {
+                "p50": percentile(seconds, 0.5),
+                "p95": percentile(seconds, 0.95),
+                **{metric: percentile([run[stage][metric] for run in runs], 0.5)
+                   for metric in ("llm_calls", "prompt_tokens", "completion_tokens", "throttled", "retries")},
+            }
+        return {"stages": stages}
+
+    def register(self, document: bytes, content: str, pages: int) -> bytes:
+        """Make a document known to the fake Document Intelligence service and return its bytes."""
+        self.document_intelligence.register(document, content, pages)
+        return document
+
+
+def print_report(report: dict):
+    """Print the cold-start import times and the per-stage measurements of every document set."""
+    if report.get("startup"):
+        print(f"\ncold start\n  {'module':<20}{'p50 (s)':>10}{'p95 (s)':>10}")
+        for module, values in report["startup"].items():
+            print(f"  {module:<20}{values['p50']:>10.2f}{values['p95']:>10.2f}")
+    for name, result in report["documents"].items():
+        print(f"\n{name}")
+        print(f"  {'stage':<20}{'p50 (s)':>10}{'p95 (s)':>10}{'LLM calls':>11}{'prompt tok':>12}{'compl. tok':>12}{'429s':>6}{'retries':>9}")
+        for stage, values in result["stages"].items():
+            print(f"  {stage:<20}{values['p50']:>10.2f}{values['p95']:>10.2f}{values['llm_calls']:>11.0f}"
+                  f"{values['prompt_tokens']:>12.0f}{values['completion_tokens']:>12.0f}{values['throttled']:>6.0f}"
+                  f"{values.get('retries', 0):>9.0f}")
+
+
+async def run(args) -> int:
+    """Run the benchmark for the parsed command-line arguments."""
+    # Measured before the harness imports anything, in separate interpreters
+    startup = {}
+    if args.startup_runs:
+        print("Measuring cold-start import times")
+        startup = measure_startup(STARTUP_MODULES, args.startup_runs)
+
+    harness = BenchmarkHarness(args)
+    document_sets = []
+
+    if not args.skip_sample:
+        import local_extraction
+
+        rfp_dir = os.path.join(SAMPLE_DOCS, "RFP")
+        proposal_dir = os.path.join(SAMPLE_DOCS, "Vendor Proposals")
+        rfp_path = os.path.join(rfp_dir, sorted(os.listdir(rfp_dir))[0])
+        proposal_path = os.path.join(proposal_dir, sorted(os.listdir(proposal_dir))[0])
+        sample = []
+        for path in (rfp_path, proposal_path):
+            with open(path, "rb") as file:
+                data = file.read()
+            content = local_extraction.docx_to_markdown(data)
+            sample.append(harness.register(data, content, max(len(content.split()) // WORDS_PER_PAGE, 1)))
+        document_sets.append(("sample", *sample))
+
+    for pages in args.pages:
+        rfp = synthetic_document(pages, f"Synthetic RFP ({pages} pages)", seed=pages)
+        proposal = synthetic_document(pages, f"Synthetic Proposal ({pages} pages)", seed=pages + 1)
+        document_sets.append((f"synthetic-{pages}p",
+                              harness.register(rfp.encode("utf-8"), rfp, pages),
+                              harness.register(proposal.encode("utf-8"), proposal, pages)))
+
+    report = {"config": {key: value for key, value in vars(args).items()
+                         if key not in ("output", "baseline", "save_baseline", "tolerance", "min_delta_ms")},
+              "startup": startup, "documents": {}}
+    for name, rfp, proposal in document_sets:
+        print(f"Benchmarking {name}")
+        report["documents"][name] = await harness.run_document_set(name, rfp, proposal, args.iterations)
+    harness.scratch.cleanup()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("config") != report["config"]:
+            print("\nWarning: the baseline was recorded with different benchmark settings.")
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RFP analysis pipeline against simulated Azure services.")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per document set.")
+    parser.add_argument("--pages", type=int, nargs="*", default=[50, 300], help="Page counts of the synthetic documents.")
+    parser.add_argument("--skip-sample", action="store_true", help="Skip the documents in documents/sample-docs.")
+    parser.add_argument("--llm-latency-ms", type=float, default=600, help="Azure OpenAI time to first token.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=200, help="Maximum random latency added to each LLM call.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80, help="Azure OpenAI completion throughput.")
+    parser.add_argument("--llm-throttle-rate", type=float, default=0.02, help="Share of LLM calls answered with 429.")
+    parser.add_argument("--llm-completion-tokens", type=int, default=400, help="Tokens per summarization completion.")
+    parser.add_argument("--agent-completion-tokens", type=int, default=300, help="Tokens per agent response.")
+    parser.add_argument("--di-latency-ms", type=float, default=1500, help="Document Intelligence base analysis time.")
+    parser.add_argument("--di-jitter-ms", type=float, default=300, help="Maximum random latency added to each analysis.")
+    parser.add_argument("--di-page-ms", type=float, default=40, help="Document Intelligence analysis time per page.")
+    parser.add_argument("--di-throttle-rate", type=float, default=0.0, help="Share of analyses answered with 429.")
+    parser.add_argument("--search-latency-ms", type=float, default=80, help="AI Search query latency.")
+    parser.add_argument("--search-jitter-ms", type=float, default=40, help="Maximum random latency added to each query.")
+    parser.add_argument("--search-throttle-rate", type=float, default=0.01, help="Share of queries answered with 429.")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh-interpreter imports per module; 0 skips them.")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Factor applied to every simulated delay.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated jitter and throttling.")
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, help="Save the report as the baseline.")
+    parser.add_argument("--baseline", help="Compare against a saved baseline and exit with 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative increase over the baseline.")
+    parser.add_argument("--min-delta-ms", type=float, default=50,
+                        help="Latency increase over the baseline that is always tolerated.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    return asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
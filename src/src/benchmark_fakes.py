@@ -0,0 +1,397 @@
+"""
+Latency-simulating Azure OpenAI, Document Intelligence and AI Search services used by benchmark.py.
+
+The fakes sit below the real SDK clients: Azure OpenAI is served through an httpx mock transport,
+Document Intelligence and AI Search through a requests adapter of the azure-core transports. Each
+service sleeps for a configurable base latency plus seeded jitter, generates completions at a
+configurable token throughput and answers a share of the requests with HTTP 429 and a Retry-After
+header, so the retry policies of the SDKs and the retry hooks of the app handle them as in
+production. Calls, tokens and 429 responses are counted so the benchmark can report them.
+"""
+import asyncio
+import io
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    # Recent openai releases ship their own fork of httpx; the mock transport must come from the same package
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+from chunking import get_tokenizer
+
+FAKE_ENDPOINT = "https://benchmark.invalid"
+
+_FILLER = ("The vendor commits to the stated service levels, pricing and compliance obligations, and the "
+           "evaluation notes the associated delivery risks, dependencies and mitigation measures.").split()
+
+# Closing sentence of every free-text completion, with the markers the termination strategy and score extraction look for
+_CLOSING = ("Compliance score: 8/10. Final score: 7.5/10. Risk level: medium risk. "
+            "We recommend proceeding to negotiation.")
+
+
+class LatencyProfile:
+    """
+    Simulated behaviour of one Azure service.
+    """
+
+    def __init__(self, latency_ms: float, jitter_ms: float = 0.0, tokens_per_second: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after_ms: float = 1000.0, time_scale: float = 1.0, seed: int = 0):
+        """
+        Initialize the latency profile.
+
+        :param latency_ms: Base latency of a request.
+        :param jitter_ms: Maximum random latency added to a request.
+        :param tokens_per_second: Completion throughput; 0 means completions take no extra time.
+        :param throttle_rate: Share of requests answered with HTTP 429.
+        :param retry_after_ms: Back-off a throttled request is told to wait before retrying.
+        :param time_scale: Factor applied to every simulated delay, e.g. 0.1 for quicker runs.
+        :param seed: Seed of the jitter and throttling random generator.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.throttle_rate = throttle_rate
+        self.retry_after_ms = retry_after_ms
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def request_delay(self) -> float:
+        """Seconds until the first byte of a response."""
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms)
+        return (self.latency_ms + jitter) / 1000 * self.time_scale
+
+    def generation_delay(self, tokens: int) -> float:
+        """Seconds to generate a completion of the given length."""
+        return tokens / self.tokens_per_second * self.time_scale if self.tokens_per_second else 0.0
+
+    def throttled(self) -> bool:
+        """Whether the next request is answered with HTTP 429."""
+        with self._lock:
+            return self._random.random() < self.throttle_rate
+
+    def retry_headers(self) -> dict:
+        """Headers of a 429 response, telling the client how long to back off like the Azure services do."""
+        retry_after_ms = self.retry_after_ms * self.time_scale
+        return {"retry-after-ms": str(int(retry_after_ms)), "retry-after": str(max(math.ceil(retry_after_ms / 1000), 1)),
+                "content-type": "application/json"}
+
+
+class ServiceStats:
+    """
+    Thread-safe call, token and throttling counters of a fake service.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Set every counter to zero."""
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.throttled = 0
+
+    def record(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """Count one successful call."""
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def record_throttled(self):
+        """Count one request answered with HTTP 429."""
+        with self._lock:
+            self.throttled += 1
+
+    def snapshot(self) -> dict:
+        """Returns the current counters."""
+        with self._lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens, "throttled": self.throttled}
+
+
+def _filler_text(tokens: int, tokenizer) -> str:
+    """Deterministic filler text of roughly the given number of tokens."""
+    sentence = " ".join(_FILLER)
+    repeats = max(math.ceil(tokens / tokenizer.count(sentence)), 1)
+    return " ".join([sentence] * repeats)
+
+
+def _error_body(status_code: int, message: str) -> bytes:
+    return json.dumps({"error": {"code": str(status_code), "message": message}}).encode("utf-8")
+
+
+class FakeAzureOpenAI:
+    """
+    Simulated Azure OpenAI chat completions endpoint, served to the openai client through an httpx mock transport.
+
+    Requests with a response_format are answered with a vendor proposal summary in JSON, all others
+    with filler text. Streaming requests receive the completion as server-sent events.
+    """
+
+    def __init__(self, profile: LatencyProfile, stats: ServiceStats, completion_tokens: int = 400,
+                 vendor_name: str = "Benchmark Vendor", tokenizer=None):
+        """
+        Initialize the fake endpoint.
+
+        :param profile: Simulated latency, throughput and throttling.
+        :param stats: Counters the calls are recorded in.
+        :param completion_tokens: Length of every completion, capped by the request's max_tokens.
+        :param vendor_name: Vendor name of the proposal summaries.
+        :param tokenizer: Tokenizer used to count tokens; defaults to get_tokenizer().
+        """
+        self.profile = profile
+        self.stats = stats
+        self.completion_tokens = completion_tokens
+        self.vendor_name = vendor_name
+        self.tokenizer = tokenizer or get_tokenizer()
+
+    def transport(self):
+        """Returns an httpx transport answering the openai client's requests."""
+        return httpx.MockTransport(self.handle)
+
+    def create_chat_completion(self):
+        """Returns a Semantic Kernel Azure OpenAI chat completion service connected to the fake endpoint."""
+        from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+        from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+
+        client = AsyncAzureOpenAI(azure_endpoint=FAKE_ENDPOINT, api_key="benchmark", api_version="2024-10-21",
+                                  http_client=DefaultAsyncHttpxClient(transport=self.transport()))
+        return AzureChatCompletion(deployment_name="benchmark", async_client=client)
+
+    def _content(self, body: dict) -> str:
+        tokens = min(self.completion_tokens, body.get("max_tokens") or body.get("max_completion_tokens") or self.completion_tokens)
+        if body.get("response_format"):
+            return json.dumps({
+                "vendor_name": self.vendor_name,
+                "legal_summary": _filler_text(tokens // 2, self.tokenizer),
+                "overall_summary": _filler_text(tokens // 2, self.tokenizer),
+            })
+        return f"{_filler_text(tokens, self.tokenizer)}\n\n{_CLOSING}"
+
+    def _prompt_tokens(self, messages: list) -> int:
+        total = 0
+        for message in messages:
+            content = message.get("content") or ""
+            if isinstance(content, list):
+                content = " ".join(str(part.get("text", "")) for part in content if isinstance(part, dict))
+            total += self.tokenizer.count(str(content))
+        return total
+
+    async def handle(self, request):
+        """Answer a chat completion request, or throttle it."""
+        await asyncio.sleep(self.profile.request_delay())
+        if self.profile.throttled():
+            self.stats.record_throttled()
+            return httpx.Response(429, headers=self.profile.retry_headers(), content=_error_body(429, "Rate limit exceeded."))
+
+        body = json.loads(request.content)
+        content = self._content(body)
+        usage = {"prompt_tokens": self._prompt_tokens(body.get("messages", [])), "completion_tokens": self.tokenizer.count(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.stats.record(usage["prompt_tokens"], usage["completion_tokens"])
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=self._events(content, usage if include_usage else None))
+
+        await asyncio.sleep(self.profile.generation_delay(usage["completion_tokens"]))
+        return httpx.Response(200, json={
+            "id": "chatcmpl-benchmark", "object": "chat.completion", "created": int(time.time()), "model": "benchmark",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def _events(self, content: str, usage: dict = None):
+        """Stream the completion in pieces of about ten words at the configured throughput."""
+        def event(choices, **fields):
+            chunk = {"id": "chatcmpl-benchmark", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": "benchmark", "choices": choices, **fields}
+            return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+        words = content.split(" ")
+        for start in range(0, len(words), 10):
+            piece = " ".join(words[start:start + 10]) + " "
+            await asyncio.sleep(self.profile.generation_delay(self.tokenizer.count(piece)))
+            yield event([{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}])
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if usage is not None:
+            yield event([], usage=usage)
+        yield b"data: [DONE]\n\n"
+
+
+class _ServiceAdapter(HTTPAdapter):
+    """requests adapter answering every request with a fake service instead of the network."""
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+
+    def send(self, request, **kwargs):
+        status, headers, body = self.handler(request)
+        raw = urllib3.HTTPResponse(body=io.BytesIO(body), status=status, headers=headers,
+                                   preload_content=False, decode_content=False)
+        return self.build_response(request, raw)
+
+
+def _session(handler) -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", _ServiceAdapter(handler))
+    return session
+
+
+def _request_body(request) -> bytes:
+    body = request.body
+    if hasattr(body, "read"):
+        return body.read()
+    return body.encode("utf-8") if isinstance(body, str) else body or b""
+
+
+class FakeDocumentIntelligence:
+    """
+    Simulated Document Intelligence layout service returning registered Markdown for each document.
+
+    An analysis is accepted with 202 and a Retry-After of the simulated analysis time, after which the
+    client's poller finds the result, so the long-running operation polling of the SDK runs as well.
+    """
+
+    def __init__(self, profile: LatencyProfile, stats: ServiceStats, page_ms: float = 0.0):
+        """
+        Initialize the fake service.
+
+        :param profile: Simulated base latency and throttling of an analysis.
+        :param stats: Counters the analyses are recorded in.
+        :param page_ms: Additional latency per page.
+        """
+        self.profile = profile
+        self.stats = stats
+        self.page_ms = page_ms
+        self._documents = {}
+        self._operations = {}
+        self._operation_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def register(self, document: bytes, content: str, pages: int):
+        """
+        Set the layout result of a document.
+
+        :param document: Document bytes as uploaded.
+        :param content: Markdown content returned for the document.
+        :param pages: Number of pages, which scales the analysis latency.
+        """
+        self._documents[document] = (content, pages)
+
+    def page_count(self, document: bytes) -> int:
+        """Number of pages of a registered document, or None if it is unknown."""
+        return self._documents[document][1] if document in self._documents else None
+
+    def create_client(self):
+        """Returns a DocumentIntelligenceClient connected to the fake service."""
+        from azure.ai.documentintelligence import DocumentIntelligenceClient
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import RequestsTransport
+
+        return DocumentIntelligenceClient(endpoint=FAKE_ENDPOINT, credential=AzureKeyCredential("benchmark"),
+                                          transport=RequestsTransport(session=_session(self.handle), use_env_settings=False))
+
+    @staticmethod
+    def _page_content(content: str, pages: int, first: int, last: int) -> str:
+        """Content of pages first to last, spreading the blocks of the content evenly over the pages."""
+        blocks = content.split("\n\n")
+        start = (first - 1) * len(blocks) // pages
+        end = min(last, pages) * len(blocks) // pages
+        return "\n\n".join(blocks[start:end])
+
+    def handle(self, request) -> tuple:
+        """Accept an analysis of the document or of a page range such as "1-50", or return the result of one."""
+        url = urlparse(request.url)
+        if request.method == "GET":
+            with self._lock:
+                content = self._operations[url.path.rsplit("/", 1)[-1]]
+            return 200, {"content-type": "application/json"}, json.dumps({
+                "status": "succeeded", "createdDateTime": "2025-01-01T00:00:00Z", "lastUpdatedDateTime": "2025-01-01T00:00:00Z",
+                "analyzeResult": {"apiVersion": "2024-11-30", "modelId": "prebuilt-layout", "stringIndexType": "textElements",
+                                  "content": content, "contentFormat": "markdown", "pages": []},
+            }).encode("utf-8")
+
+        time.sleep(self.profile.request_delay())
+        if self.profile.throttled():
+            self.stats.record_throttled()
+            return 429, self.profile.retry_headers(), _error_body(429, "Rate limit exceeded.")
+
+        document = _request_body(request)
+        content, page_count = self._documents.get(document, (document.decode("utf-8", errors="ignore"), 1))
+        analyzed_pages = page_count
+        pages = parse_qs(url.query).get("pages")
+        if pages:
+            first, _, last = pages[0].partition("-")
+            first, last = int(first), int(last or first)
+            content = self._page_content(content, page_count, first, last)
+            analyzed_pages = min(last, page_count) - first + 1
+        self.stats.record()
+
+        with self._lock:
+            operation_id = f"benchmark-{next(self._operation_ids)}"
+            self._operations[operation_id] = content
+        analysis_ms = max(analyzed_pages * self.page_ms * self.profile.time_scale, 1)
+        location = f"{FAKE_ENDPOINT}/documentintelligence/documentModels/prebuilt-layout/analyzeResults/{operation_id}?api-version=2024-11-30"
+        return 202, {"operation-location": location, "retry-after-ms": str(int(analysis_ms))}, b""
+
+
+class FakeSearchService:
+    """
+    Simulated Azure AI Search service returning canned documents for every query.
+    """
+
+    def __init__(self, profile: LatencyProfile, stats: ServiceStats, indexes: dict):
+        """
+        Initialize the fake service.
+
+        :param profile: Simulated latency and throttling of a query.
+        :param stats: Counters the queries are recorded in.
+        :param indexes: Documents returned for every query of each index, best first.
+        """
+        self.profile = profile
+        self.stats = stats
+        self.indexes = indexes
+        self._session = _session(self.handle)
+
+    def create_client(self, index_name: str):
+        """Returns an async SearchClient for an index of the fake service."""
+        from azure.core.credentials import AzureKeyCredential
+        from azure.core.pipeline.transport import AsyncioRequestsTransport
+        from azure.search.documents.aio import SearchClient
+
+        return SearchClient(endpoint=FAKE_ENDPOINT, index_name=index_name, credential=AzureKeyCredential("benchmark"),
+                            transport=AsyncioRequestsTransport(session=self._session, use_env_settings=False))
+
+    def handle(self, request) -> tuple:
+        """Answer a query with the first top documents of the index, or throttle it."""
+        time.sleep(self.profile.request_delay())
+        if self.profile.throttled():
+            self.stats.record_throttled()
+            return 429, self.profile.retry_headers(), _error_body(429, "Rate limit exceeded.")
+
+        index_name = re.search(r"/indexes\('([^']+)'\)", unquote(request.url)).group(1)
+        query = json.loads(_request_body(request) or b"{}")
+        select = query["select"].split(",") if query.get("select") else None
+        documents = [{**({field: document.get(field) for field in select} if select else document), "@search.score": 1.0}
+                     for document in self.indexes.get(index_name, [])[:query.get("top", 50)]]
+        self.stats.record()
+        return 200, {"content-type": "application/json"}, json.dumps({"value": documents}).encode("utf-8")
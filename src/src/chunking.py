@@ -0,0 +1,183 @@
+import functools
+import math
+import re
+
+# Blank lines separate paragraphs, tables and headings in Document Intelligence markdown output
+_BLOCK_SEPARATOR = re.compile(r"\n[ \t]*\n")
+_HEADING = re.compile(r"#{1,6}\s")
+
+
+class CharRatioTokenizer:
+    """
+    Token estimator used when no real tokenizer is installed.
+
+    English text averages roughly four characters per token for GPT models, which is close
+    enough for budgeting chunk sizes.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0):
+        """
+        Initialize the estimator.
+
+        :param chars_per_token: Average number of characters per token.
+        """
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        """
+        Estimate the number of tokens in a text.
+
+        :param text: Text to measure.
+        :return: Estimated token count.
+        """
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+class TiktokenTokenizer:
+    """
+    Exact token counter backed by tiktoken.
+    """
+
+    def __init__(self, encoding):
+        """
+        Initialize the tokenizer.
+
+        :param encoding: tiktoken encoding instance.
+        """
+        self.encoding = encoding
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+
+        :param text: Text to measure.
+        :return: Token count.
+        """
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(model: str = "gpt-4o"):
+    """Return the process-wide tiktoken-backed tokenizer for the model, or a character-ratio estimator if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return CharRatioTokenizer()
+
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken downloads encodings on first use, which fails in offline containers
+        print(f"Failed to load tiktoken encoding, estimating tokens instead: {e}")
+        return CharRatioTokenizer()
+    return TiktokenTokenizer(encoding)
+
+
+def iter_blocks(content):
+    """
+    Yield the paragraph, table and heading blocks of a layout result without copying the whole document.
+
+    content may also be an iterator over consecutive parts of the document, e.g. page ranges that
+    were analyzed separately; each part is consumed only once its blocks are needed.
+    """
+    for part in [content] if isinstance(content, str) else content:
+        start = 0
+        for match in _BLOCK_SEPARATOR.finditer(part):
+            block = part[start:match.start()].strip()
+            if block:
+                yield block
+            start = match.end()
+
+        block = part[start:].strip()
+        if block:
+            yield block
+
+
+def _split_oversized(block, max_tokens, tokenizer):
+    """Split a single block that exceeds the budget on line and then word boundaries."""
+    pieces = block.splitlines() if "\n" in block else block.split()
+    separator = "\n" if "\n" in block else " "
+    current = []
+    current_tokens = 0
+
+    for piece in pieces:
+        piece_tokens = tokenizer.count(piece) + 1
+        if piece_tokens > max_tokens and separator == "\n":
+            # A single line that is still too long falls back to word splitting
+            if current:
+                yield separator.join(current)
+                current, current_tokens = [], 0
+            yield from _split_oversized(piece, max_tokens, tokenizer)
+            continue
+
+        if current and current_tokens + piece_tokens > max_tokens:
+            yield separator.join(current)
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+
+    if current:
+        yield separator.join(current)
+
+
+def iter_chunks(content, max_tokens, overlap_tokens=0, tokenizer=None):
+    """
+    Lazily split document content into chunks of at most max_tokens tokens.
+
+    Chunks break on block boundaries, preferring to start a new chunk at a heading when one is
+    available in the second half of the chunk. The last blocks of each chunk, up to
+    overlap_tokens, are repeated at the start of the next chunk.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    blocks = []  # (text, tokens, is_heading) of the chunk being built
+    total = 0
+
+    def _units():
+        for block in iter_blocks(content):
+            block_tokens = tokenizer.count(block)
+            if block_tokens <= max_tokens:
+                yield block, block_tokens, bool(_HEADING.match(block))
+            else:
+                for piece in _split_oversized(block, max_tokens, tokenizer):
+                    yield piece, tokenizer.count(piece), False
+
+    for block, block_tokens, is_heading in _units():
+        # Each block is charged one extra token for the blank line that separates it
+        if blocks and total + block_tokens + 1 > max_tokens:
+            split_at = len(blocks)
+            for index in range(len(blocks) - 1, 0, -1):
+                if blocks[index][2]:
+                    if sum(tokens for _, tokens, _ in blocks[:index]) >= max_tokens // 2:
+                        split_at = index
+                    break
+
+            yield "\n\n".join(text for text, _, _ in blocks[:split_at])
+
+            # Carry the trailing blocks into the next chunk as overlap
+            carried = blocks[split_at:]
+            overlap = []
+            overlap_total = 0
+            for previous in reversed(blocks[:split_at]):
+                if overlap_total + previous[1] > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_total += previous[1] + 1
+
+            # Overlap is dropped first if the next block would not fit alongside it
+            while overlap and sum(tokens + 1 for _, tokens, _ in overlap + carried) + block_tokens + 1 > max_tokens:
+                overlap.pop(0)
+            blocks = overlap + carried
+            total = sum(tokens + 1 for _, tokens, _ in blocks)
+
+            if carried and total + block_tokens + 1 > max_tokens:
+                yield "\n\n".join(text for text, _, _ in blocks)
+                blocks, total = [], 0
+
+        blocks.append((block, block_tokens, is_heading))
+        total += block_tokens + 1
+
+    if blocks:
+        yield "\n\n".join(text for text, _, _ in blocks)
@@ -0,0 +1,170 @@
+"""
+Headless entry point for the RFP analysis pipeline.
+
+Summarizes an RFP and one or more vendor proposals, runs the multi-agent evaluation for every
+proposal and writes the reports without Streamlit, e.g. for nightly bulk evaluations:
+
+    python cli.py --rfp "RFP - Contoso.docx" --proposals "Vendor Proposals/" --format markdown --output-dir reports
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Document types the pipeline can analyze
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+
+def collect_documents(paths: list) -> list:
+    """Expand files and directories into a sorted list of supported document paths."""
+    documents = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                file_path = os.path.join(path, name)
+                if os.path.isfile(file_path) and name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    documents.append(file_path)
+        elif os.path.isfile(path):
+            documents.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    return documents
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower() or "vendor"
+
+
+def _format_value(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def render_markdown(result: dict) -> str:
+    """Render the evaluation of one proposal as a Markdown report."""
+    lines = [f"# Evaluation Report: {result['vendor_name']}", "", "| Metric | Value |", "| --- | --- |"]
+    lines += [f"| {key.replace('_', ' ').title()} | {_format_value(value)} |" for key, value in result["scores"].items()]
+    for response in result["responses"]:
+        lines += ["", f"## {response['role']} Agent", "", response["content"]]
+    return "\n".join(lines) + "\n"
+
+
+def render_comparison_markdown(ranking: list) -> str:
+    """Render the ranked comparison of all proposals as a Markdown table."""
+    if not ranking:
+        return "# Vendor Comparison\n\nNo proposals were evaluated.\n"
+    columns = list(ranking[0].keys())
+    lines = ["# Vendor Comparison", "",
+             "| " + " | ".join(column.replace("_", " ").title() for column in columns) + " |",
+             "| " + " | ".join("---" for _ in columns) + " |"]
+    lines += ["| " + " | ".join(_format_value(row[column]) for column in columns) + " |" for row in ranking]
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(batch: dict, ranking: list, output_dir: str, output_format: str) -> list:
+    """
+    Write one report per proposal plus the comparison table, returning the written paths.
+
+    Reports are prefixed with the proposal's position, e.g. 01-contoso.md, so proposals from the same
+    or an unnamed vendor don't overwrite each other. Slugs never start with an underscore, so the
+    _comparison file can't collide with a report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    extension = "md" if output_format == "markdown" else "json"
+    width = max(len(str(len(batch["results"]))), 2)
+    written = []
+
+    for number, result in enumerate(batch["results"], start=1):
+        path = os.path.join(output_dir, f"{number:0{width}d}-{_slug(result['vendor_name'])}.{extension}")
+        with open(path, "w", encoding="utf-8") as file:
+            if output_format == "markdown":
+                file.write(render_markdown(result))
+            else:
+                json.dump(result, file, indent=2)
+        written.append(path)
+
+    path = os.path.join(output_dir, f"_comparison.{extension}")
+    with open(path, "w", encoding="utf-8") as file:
+        if output_format == "markdown":
+            file.write(render_comparison_markdown(ranking))
+        else:
+            json.dump({"rfp_summary": batch["rfp_summary"], "timings": batch["timings"], "ranking": ranking}, file, indent=2)
+    written.append(path)
+    return written
+
+
+def print_timings(batch: dict, document_count: int):
+    """Print per-stage wall-clock timings and throughput."""
+    timings = batch["timings"]
+    print("\nStage timings:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<22}{seconds:>9.2f}s")
+    for result in batch["results"]:
+        print(f"  evaluate[{result['vendor_name']}]".ljust(24) + f"{result['duration']:>9.2f}s")
+
+    total = timings["total"] or 1e-9
+    print("\nThroughput:")
+    print(f"  documents summarized  {document_count / timings['summarize_proposals'] * 60:>9.2f}/min")
+    print(f"  proposals evaluated   {len(batch['results']) / total * 60:>9.2f}/min")
+
+
+async def run(args) -> int:
+    """Run the pipeline for the parsed command-line arguments."""
+    # Imported here so --help works without service configuration
+    from batch_evaluation import evaluate_proposals, rank_results
+
+    proposal_paths = collect_documents(args.proposals)
+    if not proposal_paths:
+        print("No proposal documents found.", file=sys.stderr)
+        return 1
+
+    print(f"Evaluating {len(proposal_paths)} proposal(s) against {args.rfp}")
+    started = time.perf_counter()
+    rfp_file = open(args.rfp, "rb")
+    vendor_files = [open(path, "rb") for path in proposal_paths]
+    try:
+        batch = await evaluate_proposals(
+            rfp_file,
+            vendor_files,
+            max_workers=args.workers,
+            max_concurrent_evaluations=args.concurrent_evaluations,
+            summary_concurrency=args.summary_concurrency,
+            progress=lambda message: print(f"[{time.perf_counter() - started:8.2f}s] {message}"),
+        )
+    finally:
+        for file in [rfp_file, *vendor_files]:
+            file.close()
+
+    ranking = rank_results(batch["results"])
+    for path in write_reports(batch, ranking, args.output_dir, args.format):
+        print(f"Wrote {path}")
+    print_timings(batch, len(proposal_paths) + 1)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate vendor proposals against an RFP without the Streamlit UI.")
+    parser.add_argument("--rfp", required=True, help="Path of the RFP document.")
+    parser.add_argument("--proposals", required=True, nargs="+", help="Proposal documents or directories containing them.")
+    parser.add_argument("--output-dir", default="reports", help="Directory the reports are written to.")
+    parser.add_argument("--format", choices=["markdown", "json"], default="markdown", help="Report format.")
+    parser.add_argument("--workers", type=int, default=None, help="Documents summarized in parallel (BATCH_MAX_WORKERS).")
+    parser.add_argument("--concurrent-evaluations", type=int, default=None,
+                        help="Agent evaluations run in parallel (BATCH_MAX_CONCURRENT_EVALUATIONS).")
+    parser.add_argument("--summary-concurrency", type=int, default=None,
+                        help="Chunk summaries in flight per document (SUMMARY_MAX_CONCURRENCY).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    load_dotenv()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import re
+from collections import Counter
+
+from chunking import get_tokenizer, iter_blocks
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def _shingles(words: list, size: int = 5) -> set:
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+class ContextSection:
+    """
+    A titled block of per-session content placed after an agent's static prompt.
+    """
+
+    def __init__(self, title: str, content: str, query: str = None):
+        """
+        Initialize the context section.
+
+        :param title: Heading of the section in the instructions.
+        :param content: Section text; blank lines separate the blocks that can be deduplicated and trimmed.
+        :param query: Optional text the blocks are ranked against when trimming, e.g. the vendor's legal summary.
+                      Sections without a query are trimmed from the end instead.
+        """
+        self.title = title
+        self.content = content or ""
+        self.query = query
+
+
+class ContextBudgeter:
+    """
+    Builds agent instructions that fit a per-agent token budget.
+
+    The static prompt always comes first and is never trimmed, so every session shares the same
+    prompt prefix and provider prompt caching applies; sections follow in the order given, which
+    should run from most to least shared. Blocks repeated within or across sections, such as the
+    overlap between adjacent retrieved chunks, are kept once. If the result is still over budget,
+    the least relevant blocks of ranked sections are dropped, then the last blocks of the others.
+    """
+
+    def __init__(self, budgets: dict, default_budget: int, tokenizer=None, overlap_threshold: float = 0.8,
+                 shingle_size: int = 5):
+        """
+        Initialize the context budgeter.
+
+        :param budgets: Token budget of the instructions keyed by agent name.
+        :param default_budget: Token budget of agents not in budgets.
+        :param tokenizer: Tokenizer used to count tokens; defaults to get_tokenizer().
+        :param overlap_threshold: Share of a block's word shingles already present in kept blocks above which it is dropped.
+        :param shingle_size: Number of words per shingle.
+        """
+        self.budgets = budgets
+        self.default_budget = default_budget
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.overlap_threshold = overlap_threshold
+        self.shingle_size = shingle_size
+        self.usage = {}
+
+    def _dedupe(self, sections: list) -> list:
+        """Split the sections into blocks, dropping blocks that repeat or mostly overlap earlier ones."""
+        seen = set()
+        deduped = []
+        for section in sections:
+            blocks = []
+            for block in iter_blocks(section.content):
+                words = _words(block)
+                # Headings and short lines repeat legitimately, e.g. the same heading in both summaries
+                if block.startswith("#") or len(words) < 2 * self.shingle_size:
+                    blocks.append(block)
+                    continue
+                shingles = _shingles(words, self.shingle_size)
+                if len(shingles & seen) / len(shingles) >= self.overlap_threshold:
+                    continue
+                seen |= shingles
+                blocks.append(block)
+            deduped.append(blocks)
+        return deduped
+
+    @staticmethod
+    def _relevance(block: str, query_terms: Counter) -> float:
+        """Share of the query's terms found in a block, weighted by how often they appear in the query."""
+        words = set(_words(block))
+        total = sum(query_terms.values())
+        return sum(count for term, count in query_terms.items() if term in words) / total if total else 0.0
+
+    def _trim(self, sections: list, blocks: list, available: int) -> list:
+        """Drop blocks until the sections fit in the available tokens."""
+        costs = [[self.tokenizer.count(block) for block in section_blocks] for section_blocks in blocks]
+        total = sum(map(sum, costs))
+        dropped = set()
+
+        # Candidates in drop order: least relevant blocks of ranked sections, then trailing blocks of the rest
+        ranked = []
+        for position, section in enumerate(sections):
+            if section.query:
+                query_terms = Counter(_words(section.query))
+                ranked.extend(sorted(((self._relevance(block, query_terms), position, index)
+                                      for index, block in enumerate(blocks[position])), key=lambda item: item[0]))
+        trailing = [(0.0, position, index)
+                    for position in reversed(range(len(sections))) if not sections[position].query
+                    for index in reversed(range(len(blocks[position])))]
+
+        for _, position, index in ranked + trailing:
+            if total <= available:
+                break
+            dropped.add((position, index))
+            total -= costs[position][index]
+
+        return [[block for index, block in enumerate(section_blocks) if (position, index) not in dropped]
+                for position, section_blocks in enumerate(blocks)]
+
+    def build(self, agent_name: str, static_prompt: str, sections: list) -> str:
+        """
+        Build the instructions for an agent.
+
+        :param agent_name: Name of the agent, used to look up its budget.
+        :param static_prompt: Prompt text shared by every session.
+        :param sections: ContextSections in the order they are placed after the prompt.
+        :return: The agent instructions.
+        """
+        budget = self.budgets.get(agent_name, self.default_budget)
+        headings = [f"### {section.title}:" for section in sections]
+        fixed = self.tokenizer.count(static_prompt) + sum(self.tokenizer.count(heading) + 2 for heading in headings)
+
+        blocks = self._dedupe(sections)
+        blocks = self._trim(sections, blocks, max(budget - fixed, 0))
+
+        parts = [static_prompt]
+        for heading, section_blocks in zip(headings, blocks):
+            parts.append(f"{heading}\n" + ("\n\n".join(section_blocks) or "Not available."))
+        instructions = "\n\n".join(parts)
+
+        original = self.tokenizer.count("\n\n".join([static_prompt, *(section.content for section in sections)]))
+        tokens = self.tokenizer.count(instructions)
+        self.usage[agent_name] = tokens
+        print(f"[context] {agent_name}: {tokens} instruction tokens (budget {budget}, {original} before dedupe and trimming)")
+        return instructions
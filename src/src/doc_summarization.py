@@ -1,128 +1,388 @@
 # Import libraries
+import io
 import os
 import json
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import AzureOpenAI 
 from pydantic import BaseModel
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
+
+from chunking import get_tokenizer, iter_chunks
+
+from layout_cache import LayoutCache
+from local_extraction import DOCUMENT_INTELLIGENCE_ENGINE, LOCAL_ENGINE, detect_document_type, extract_locally, get_routing
+from summary_cache import SummaryCache
+from tracing import count_retry, count_retry_hook, count_retry_hook_sync, span
 
 # Load environment variables
 load_dotenv()
-endpoint=os.environ["AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"]
-key=os.environ["AZURE_DOC_INTELLIGENCE_KEY"]
 
-azure_openai_endpoint = os.environ["AZURE_OPENAI_ENDPOINT"]
-azure_openai_key = os.getenv("AZURE_OPENAI_API_KEY", "") if len(os.getenv("AZURE_OPENAI_API_KEY", "")) > 0 else None
-azure_openai_chat_deployment = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"]
+# The service endpoints and keys are read when the first client is created, so importing this module stays cheap
+azure_openai_chat_deployment = os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME")
+azure_openai_api_version = "2024-10-21"
+
+# Maximum number of summarize_chunk calls in flight at once
+summary_max_concurrency = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+# Context window of the chat deployment, the tokens kept free for the completion and the overlap between chunks
+summary_context_tokens = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "126000"))
+summary_completion_tokens = 1000
+summary_chunk_overlap_tokens = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", "200"))
+
+# Document Intelligence layout model
+layout_model_id = "prebuilt-layout"
+
+# Large PDFs are analyzed in page ranges of this size, with at most layout_max_concurrency ranges in flight
+layout_page_ranges = os.getenv("LAYOUT_PAGE_RANGES", "true").lower() == "true"
+layout_page_range_size = int(os.getenv("LAYOUT_PAGE_RANGE_SIZE", "50"))
+layout_page_range_min_pages = int(os.getenv("LAYOUT_PAGE_RANGE_MIN_PAGES", "100"))
+layout_max_concurrency = int(os.getenv("LAYOUT_MAX_CONCURRENCY", "4"))
+layout_range_retries = int(os.getenv("LAYOUT_RANGE_RETRIES", "2"))
+
+# Process-wide clients and caches, created on first use
+_document_intelligence_client = None
+_openai_client = None
+_layout_cache = None
+_summary_cache = None
+_client_lock = threading.Lock()
+
+
+def _azure_openai_settings() -> dict:
+    """Connection settings shared by the sync and async Azure OpenAI clients."""
+    return {
+        "azure_endpoint": os.environ["AZURE_OPENAI_ENDPOINT"],
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY") or None,
+        "api_version": azure_openai_api_version,
+    }
+
+
+def get_document_intelligence_client():
+    """Returns the process-wide Document Intelligence client, creating it on first use."""
+    global _document_intelligence_client
+    with _client_lock:
+        if _document_intelligence_client is None:
+            from azure.ai.documentintelligence import DocumentIntelligenceClient
+            from azure.core.credentials import AzureKeyCredential
+
+            _document_intelligence_client = DocumentIntelligenceClient(
+                endpoint=os.environ["AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"],
+                credential=AzureKeyCredential(os.environ["AZURE_DOC_INTELLIGENCE_KEY"]),
+            )
+        return _document_intelligence_client
+
+
+def get_openai_client():
+    """Returns the process-wide sync Azure OpenAI client, creating it on first use."""
+    global _openai_client
+    with _client_lock:
+        if _openai_client is None:
+            from openai import AzureOpenAI, DefaultHttpxClient
+
+            # The response hook counts the requests the SDK retries on the active trace span
+            _openai_client = AzureOpenAI(**_azure_openai_settings(),
+                                         http_client=DefaultHttpxClient(event_hooks={"response": [count_retry_hook_sync]}))
+        return _openai_client
+
+
+def get_layout_cache() -> LayoutCache:
+    """Returns the on-disk cache of Document Intelligence layout results, creating it on first use."""
+    global _layout_cache
+    with _client_lock:
+        if _layout_cache is None:
+            _layout_cache = LayoutCache(
+                cache_dir=os.getenv("LAYOUT_CACHE_DIR") or os.path.join(os.path.dirname(__file__), ".cache", "layout"),
+                max_bytes=int(os.getenv("LAYOUT_CACHE_MAX_MB", "256")) * 1024 * 1024,
+            )
+        return _layout_cache
+
+
+def get_summary_cache() -> SummaryCache:
+    """Returns the persistent cache of chunk and document summaries, creating it on first use."""
+    global _summary_cache
+    with _client_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache(
+                db_path=os.getenv("SUMMARY_CACHE_PATH") or os.path.join(os.path.dirname(__file__), ".cache", "summaries.sqlite3"),
+                ttl_seconds=int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000")),
+            )
+        return _summary_cache
+
+
+def create_async_openai_client():
+    """Create an async Azure OpenAI client.
+
+    Async clients hold a connection pool bound to the running event loop, so a new
+    client is created for every summarization run instead of being shared at module level.
+    """
+    from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+    return AsyncAzureOpenAI(**_azure_openai_settings(),
+                            http_client=DefaultAsyncHttpxClient(event_hooks={"response": [count_retry_hook]}),)
+
+
+def count_pages(document, document_type):
+    """Number of pages of a PDF, or None for other documents or if it cannot be read."""
+    if document_type != "pdf":
+        return None
+    try:
+        from pypdf import PdfReader
+
+        return len(PdfReader(io.BytesIO(document)).pages)
+    except Exception as e:
+        print(f"Failed to count the pages of the PDF, analyzing it in one call: {e}")
+        return None
+
+
+def page_ranges(page_count, range_size):
+    """Split pages 1 to page_count into Document Intelligence page ranges such as "1-50"."""
+    return [f"{first}-{min(first + range_size - 1, page_count)}" for first in range(1, page_count + 1, range_size)]
+
+
+def _analyze_with_document_intelligence(document, pages=None):
+    """Run the layout model on a document, or only on the given page range, returning Markdown."""
+    from azure.ai.documentintelligence.models import DocumentContentFormat
+
+    options = {"pages": pages} if pages else {}
+    poller = get_document_intelligence_client().begin_analyze_document(
+        layout_model_id, body=io.BytesIO(document), output_content_format=DocumentContentFormat.MARKDOWN,
+        raw_response_hook=lambda response: count_retry(response.http_response.status_code), **options,
+    )
+    return poller.result().content
+
+
+def analyze_page_range(document, pages, retries=None):
+    """Analyze one page range of a document, retrying only this range if its analysis fails."""
+    retries = layout_range_retries if retries is None else retries
+    with span("analyze_range", pages=pages) as current:
+        cache_key = LayoutCache.make_key(document, f"{layout_model_id}:markdown:{pages}")
+        content = get_layout_cache().get(cache_key)
+        current.set("cache_hit", content is not None)
+        if content is not None:
+            return content
+
+        for attempt in range(retries + 1):
+            current.set("attempts", attempt + 1)
+            try:
+                content = _analyze_with_document_intelligence(document, pages)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"Analysis of pages {pages} failed, retrying: {e}")
+                time.sleep(2 ** attempt)
+
+        get_layout_cache().put(cache_key, content)
+        return content
+
+
+def iter_page_ranges(document, ranges):
+    """
+    Analyze the page ranges of a document concurrently, yielding their contents in page order.
+
+    Each range is yielded as soon as it and every range before it are analyzed, so the caller can
+    start working on the first pages while later ones are still being analyzed. The analyses only
+    start once the first content is requested.
+    """
+    # The range spans are nested in the span active now, not in whichever one consumes the generator
+    context = contextvars.copy_context()
+
+    def _generate():
+        pool = ThreadPoolExecutor(max_workers=layout_max_concurrency, thread_name_prefix="layout")
+        try:
+            futures = [pool.submit(context.copy().run, analyze_page_range, document, pages) for pages in ranges]
+            for future in futures:
+                yield future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return _generate()
+
+
+def read_document(file_obj):
+    """
+    Extract the content of an in-memory document, locally for text and Word files and with Azure Document Intelligence otherwise.
+
+    PDFs of at least layout_page_range_min_pages pages are analyzed in page ranges in parallel;
+    their content is returned as a lazy iterator over the range contents in page order.
+
+    :param file_obj: File-like object of the document.
+    :return: Text identifying the content for the summary cache, and the content as a string or an iterator of parts.
+    """
+    with span("analyze") as current:
+        file_obj.seek(0)
+        document = file_obj.read()
+        current.set("bytes", len(document))
+
+        document_type = detect_document_type(document, getattr(file_obj, "name", None))
+        current.set("document_type", document_type)
+        if get_routing().get(document_type) == LOCAL_ENGINE:
+            content = extract_locally(document, document_type)
+            if content is not None:
+                current.set("engine", LOCAL_ENGINE)
+                return content, content
+        current.set("engine", DOCUMENT_INTELLIGENCE_ENGINE)
+        current.set("model", layout_model_id)
 
-# Set up clients
-document_intelligence_client  = DocumentIntelligenceClient(endpoint=endpoint, credential=AzureKeyCredential(key))
-openai_client = AzureOpenAI(azure_endpoint=azure_openai_endpoint, api_key=azure_openai_key, api_version="2024-10-21",)
+        # Markdown output keeps headings and paragraph breaks, which the chunker splits on
+        cache_key = LayoutCache.make_key(document, f"{layout_model_id}:markdown")
+        content = get_layout_cache().get(cache_key)
+        current.set("cache_hit", content is not None)
+        if content is not None:
+            return content, content
+
+        page_count = count_pages(document, document_type) if layout_page_ranges else None
+        ranges = page_ranges(page_count, layout_page_range_size) if page_count and page_count >= layout_page_range_min_pages else []
+        current.set("page_ranges", len(ranges))
+        if not ranges:
+            content = _analyze_with_document_intelligence(document)
+            get_layout_cache().put(cache_key, content)
+            return content, content
+
+    return f"{cache_key}:ranges", iter_page_ranges(document, ranges)
 
 
 def analyze_document(file_obj):
-    """Analyze the layout of an in-memory document using Azure Document Intelligence."""
-    file_obj.seek(0)
-    poller = document_intelligence_client.begin_analyze_document("prebuilt-layout", body=file_obj)
-    result_json = poller.result()
-    return result_json.content
+    """Extract the content of an in-memory document as one string."""
+    _, content = read_document(file_obj)
+    return content if isinstance(content, str) else "\n\n".join(content)
 
 # Chunk text content
-def chunk_text(content, max_model_tokens, reserved_tokens=1000):
-    """Chunk the text content into smaller segments based on the token limit of the model."""
-    max_tokens = max_model_tokens - reserved_tokens
-    words = content.split()
-    chunks = []
-    current_chunk = []
-    current_length = 0
-    
-    for word in words:
-        word_length = len(word) + 1
-        if current_length + word_length > max_tokens:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
-            current_length = word_length
-        else:
-            current_chunk.append(word)
-            current_length += word_length
-    
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-        
-    return chunks
+def input_token_budget(doc_type):
+    """Number of input tokens that fit the model's context window next to the prompt and the completion."""
+    return summary_context_tokens - summary_completion_tokens - get_tokenizer().count(SUMMARY_PROMPTS[doc_type])
+
+
+def chunk_text(content, doc_type):
+    """Lazily chunk the text content, or an iterator of its parts, so each chunk plus the prompt fits the model's context window."""
+    return iter_chunks(content, input_token_budget(doc_type), overlap_tokens=summary_chunk_overlap_tokens, tokenizer=get_tokenizer())
+
+# Summarization prompts per document type
+SUMMARY_PROMPTS = {
+    "rfp": (
+            "You are summarizing a Request for Proposal (RFP). The RFP may be for any domain, and your summary should retain "
+            "all critical information while ensuring clarity and organization. The summary **must be in Markdown format** "
+            "with **clearly defined sections** that allow for easy comparison with vendor proposals.\n\n"
+            "Ensure the summary contains the following sections:\n"
+            "- **General Information** (Must include: Issued by, Release Date, Proposal Submission Deadline)\n"
+            "- **Purpose** (Clearly state the objective of the RFP)\n"
+            "- **Technical Requirements** (List any technical criteria, integrations, security expectations, or compliance frameworks)\n"
+            "- **Functional Requirements** (Outline required features, user functionalities, and system expectations)\n"
+            "- **Legal & Compliance Requirements** (Ensure ALL compliance-related information is included with proper section headers)\n"
+            "- **Financial & Support Requirements** (Capture vendor financial stability expectations, SLA conditions, support availability)\n"
+            "- **Evaluation Criteria** (Clearly highlight weightage factors if mentioned in the document)\n"
+            "- **Submission Requirements** (Specify deadline, format, and proposal structure if provided)\n\n"
+            "### Formatting Guidelines:\n"
+            "- Use **bold headings** (##, ###) for section titles.\n"
+            "- Preserve important **bullet points** and subpoints.\n"
+            "- Ensure all compliance-related areas are clearly marked (e.g., Legal & Compliance).\n"
+            "- If weightage is present in the RFP, **retain numerical evaluation weightage in the criteria section**.\n"
+            "- If any section is missing in the document, **do not remove the section but note its absence**.\n"
+            "Maintain the structure **even if some details are missing**, ensuring that missing sections are marked as 'Not specified in the RFP.'"
+    ),
+    "proposal": (
+        "You are summarizing a vendor proposal. Extract all key details that may be required to evaluate the proposal comprehensively. "
+        "Your summary must capture:\n"
+        "- **Vendor Name**: The official name of the vendor.\n"
+        "- **Legal Summary**: Key compliance, security, and regulatory commitments, including adherence to standards such as ISO 27001, SOC 2, GDPR, HIPAA, or any other relevant frameworks.\n"
+        "- **Overall Summary**: A detailed overview of the proposal, including:\n"
+        "  - **Solution Offering**: Describe the product or service being proposed, including key features and differentiators.\n"
+        "  - **Security & Compliance**: Highlight encryption methods, data protection policies, and adherence to compliance frameworks.\n"
+        "  - **Service-Level Agreements (SLA)**: Include response times, uptime guarantees, and escalation procedures.\n"
+        "  - **Implementation Approach**: Summarize the deployment process, estimated timeline, and key milestones.\n"
+        "  - **Financials & Pricing**: Capture pricing models (subscription-based, per-user cost, or fixed fee), licensing terms, and any hidden costs.\n"
+        "  - **Support & Customer Success**: Describe support models, availability (24/7, business hours), and dedicated account management options.\n"
+        "  - **Past Performance & References**: Highlight past client engagements, case studies, or success stories that validate the vendor’s capabilities.\n\n"
+        "The **overall_summary** must include all major aspects of the proposal, ensuring the summary remains detailed and useful for decision-making.\n"
+        "Do not omit any critical financial, security, or SLA details even if they are not explicitly requested in the proposal document.\n"
+        "If certain details are missing from the proposal, note them as 'Not specified in the proposal' instead of omitting them.\n\n"
+    )
+}
+
+
+class VendorProposalSummary(BaseModel):
+    vendor_name: str
+    legal_summary: str
+    overall_summary: str
+
+
+def _summary_cache_key(kind, text, doc_type):
+    """Build the summary cache key for text summarized with the current prompt and deployment."""
+    return SummaryCache.make_key(kind, text, doc_type, SUMMARY_PROMPTS[doc_type], azure_openai_chat_deployment)
+
+
+def _build_messages(chunk, doc_type):
+    """Build the chat messages sent to the model for a chunk."""
+    return [{"role": "system", "content": [{"type": "text", "text": f"{SUMMARY_PROMPTS[doc_type]}\n\n{chunk}"}]}]
 
 # Summarize the chunk
 def summarize_chunk(chunk, doc_type):
     """Summarize the chunk of text using the Azure OpenAI API."""
-    prompts = {
-        "rfp": (
-                "You are summarizing a Request for Proposal (RFP). The RFP may be for any domain, and your summary should retain "
-                "all critical information while ensuring clarity and organization. The summary **must be in Markdown format** "
-                "with **clearly defined sections** that allow for easy comparison with vendor proposals.\n\n"
-                "Ensure the summary contains the following sections:\n"
-                "- **General Information** (Must include: Issued by, Release Date, Proposal Submission Deadline)\n"
-                "- **Purpose** (Clearly state the objective of the RFP)\n"
-                "- **Technical Requirements** (List any technical criteria, integrations, security expectations, or compliance frameworks)\n"
-                "- **Functional Requirements** (Outline required features, user functionalities, and system expectations)\n"
-                "- **Legal & Compliance Requirements** (Ensure ALL compliance-related information is included with proper section headers)\n"
-                "- **Financial & Support Requirements** (Capture vendor financial stability expectations, SLA conditions, support availability)\n"
-                "- **Evaluation Criteria** (Clearly highlight weightage factors if mentioned in the document)\n"
-                "- **Submission Requirements** (Specify deadline, format, and proposal structure if provided)\n\n"
-                "### Formatting Guidelines:\n"
-                "- Use **bold headings** (##, ###) for section titles.\n"
-                "- Preserve important **bullet points** and subpoints.\n"
-                "- Ensure all compliance-related areas are clearly marked (e.g., Legal & Compliance).\n"
-                "- If weightage is present in the RFP, **retain numerical evaluation weightage in the criteria section**.\n"
-                "- If any section is missing in the document, **do not remove the section but note its absence**.\n"
-                "Maintain the structure **even if some details are missing**, ensuring that missing sections are marked as 'Not specified in the RFP.'"
-        ),
-        "proposal": (
-            "You are summarizing a vendor proposal. Extract all key details that may be required to evaluate the proposal comprehensively. "
-            "Your summary must capture:\n"
-            "- **Vendor Name**: The official name of the vendor.\n"
-            "- **Legal Summary**: Key compliance, security, and regulatory commitments, including adherence to standards such as ISO 27001, SOC 2, GDPR, HIPAA, or any other relevant frameworks.\n"
-            "- **Overall Summary**: A detailed overview of the proposal, including:\n"
-            "  - **Solution Offering**: Describe the product or service being proposed, including key features and differentiators.\n"
-            "  - **Security & Compliance**: Highlight encryption methods, data protection policies, and adherence to compliance frameworks.\n"
-            "  - **Service-Level Agreements (SLA)**: Include response times, uptime guarantees, and escalation procedures.\n"
-            "  - **Implementation Approach**: Summarize the deployment process, estimated timeline, and key milestones.\n"
-            "  - **Financials & Pricing**: Capture pricing models (subscription-based, per-user cost, or fixed fee), licensing terms, and any hidden costs.\n"
-            "  - **Support & Customer Success**: Describe support models, availability (24/7, business hours), and dedicated account management options.\n"
-            "  - **Past Performance & References**: Highlight past client engagements, case studies, or success stories that validate the vendor’s capabilities.\n\n"
-            "The **overall_summary** must include all major aspects of the proposal, ensuring the summary remains detailed and useful for decision-making.\n"
-            "Do not omit any critical financial, security, or SLA details even if they are not explicitly requested in the proposal document.\n"
-            "If certain details are missing from the proposal, note them as 'Not specified in the proposal' instead of omitting them.\n\n"
-        )
-    }
+    with span("summarize_chunk", doc_type=doc_type) as current:
+        cache_key = _summary_cache_key("chunk", chunk, doc_type)
+        cached = get_summary_cache().get(cache_key)
+        current.set("cache_hit", cached is not None)
+        if cached is not None:
+            return cached
 
-    class VendorProposalSummary(BaseModel):
-        vendor_name: str
-        legal_summary: str
-        overall_summary: str
+        messages = _build_messages(chunk, doc_type)
 
-    if doc_type=='rfp':
-        messages = [{"role": "system", "content": [{"type": "text", "text": f"{prompts[doc_type]}\n\n{chunk}"}]}]
-    
-        completion = openai_client.chat.completions.create(
-            model=azure_openai_chat_deployment,  
-            messages=messages,
-            max_tokens=1000,) 
+        if doc_type=='rfp':
+            completion = get_openai_client().chat.completions.create(
+                model=azure_openai_chat_deployment,  
+                messages=messages,
+                max_tokens=1000,) 
 
-        result = completion.choices[0].message.content
+            result = completion.choices[0].message.content
 
-    elif doc_type=='proposal':
-        messages = [{"role": "system", "content": [{"type": "text", "text": f"{prompts[doc_type]}\n\n{chunk}"}]}]
-    
-        completion = openai_client.beta.chat.completions.parse(
-            model=azure_openai_chat_deployment,  
-            messages=messages,
-            response_format=VendorProposalSummary,
-            max_tokens=1000,) 
+        elif doc_type=='proposal':
+            completion = get_openai_client().beta.chat.completions.parse(
+                model=azure_openai_chat_deployment,  
+                messages=messages,
+                response_format=VendorProposalSummary,
+                max_tokens=1000,) 
 
-        result = completion.choices[0].message.content
-        
-    return result
+            result = completion.choices[0].message.content
+
+        current.record_usage(completion.usage)
+        get_summary_cache().put(cache_key, "chunk", result)
+        return result
+
+
+async def summarize_chunk_async(client, chunk, doc_type):
+    """Summarize the chunk of text using the async Azure OpenAI client."""
+    with span("summarize_chunk", doc_type=doc_type) as current:
+        cache_key = _summary_cache_key("chunk", chunk, doc_type)
+        cached = get_summary_cache().get(cache_key)
+        current.set("cache_hit", cached is not None)
+        if cached is not None:
+            return cached
+
+        messages = _build_messages(chunk, doc_type)
+
+        if doc_type=='rfp':
+            completion = await client.chat.completions.create(
+                model=azure_openai_chat_deployment,
+                messages=messages,
+                max_tokens=1000,)
+
+            result = completion.choices[0].message.content
+
+        elif doc_type=='proposal':
+            completion = await client.beta.chat.completions.parse(
+                model=azure_openai_chat_deployment,
+                messages=messages,
+                response_format=VendorProposalSummary,
+                max_tokens=1000,)
+
+            result = completion.choices[0].message.content
+
+        current.record_usage(completion.usage)
+        get_summary_cache().put(cache_key, "chunk", result)
+        return result
 
 
 def save_summary(summary, doc_type):
@@ -151,15 +411,139 @@ def save_summary(summary, doc_type):
             }
 
 
-def summarize_document(file_obj, doc_type):
-    """Summarize an in-memory document without saving."""
-    analyze_result = analyze_document(file_obj)
-    chunks = chunk_text(analyze_result, 126000)
+async def map_chunks(client, chunks, doc_type, max_concurrency=None):
+    """Summarize chunks concurrently, returning the partial summaries in chunk order."""
+    semaphore = asyncio.Semaphore(max_concurrency or summary_max_concurrency)
+
+    async def _summarize(chunk):
+        try:
+            return await summarize_chunk_async(client, chunk, doc_type)
+        finally:
+            semaphore.release()
 
-    if len(chunks) == 1:
-        final_summary = summarize_chunk(chunks[0], doc_type)
-    else:
-        summaries = [summarize_chunk(chunk, doc_type) for chunk in chunks]
-        final_summary = summarize_chunk(" ".join(summaries), doc_type)
+    with span("map", doc_type=doc_type) as current:
+        # Chunks are pulled from the generator only when a slot frees up, so at most
+        # max_concurrency chunks are held in memory besides the finished summaries. The generator
+        # runs in a worker thread since it may wait for page ranges that are still being analyzed
+        tasks = []
+        chunks = iter(chunks)
+        while True:
+            await semaphore.acquire()
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(_summarize(chunk)))
+        current.set("chunks", len(tasks))
 
-    return save_summary(final_summary, doc_type)
+        # gather preserves the order of its arguments, so the reduce step sees chunks in document order
+        return await asyncio.gather(*tasks)
+
+
+def _traced_chunks(chunks):
+    """Yield chunks from a lazy chunk generator, tracing the time spent producing each one."""
+    iterator = iter(chunks)
+    index = 0
+    while True:
+        with span("chunk", index=index) as current:
+            chunk = next(iterator, None)
+            current.set("chars", len(chunk) if chunk is not None else 0)
+        if chunk is None:
+            return
+        yield chunk
+        index += 1
+
+
+def batch_summaries(summaries, max_tokens):
+    """Group partial summaries, in order, into batches whose joined text fits within max_tokens."""
+    tokenizer = get_tokenizer()
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for summary in summaries:
+        summary_tokens = tokenizer.count(summary) + 1
+        if current and current_tokens + summary_tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += summary_tokens
+
+    if current:
+        batches.append(current)
+
+    # Every level must shrink the number of summaries; pair them up if none could be combined
+    if len(batches) == len(summaries):
+        batches = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    return batches
+
+
+async def reduce_summaries(client, summaries, doc_type, max_concurrency=None, report=None):
+    """
+    Tree-reduce partial summaries into one.
+
+    Each level groups the summaries into batches that fit the context window and reduces the
+    batches in parallel, repeating until a single summary remains. Depth and fan-out per level
+    are written to report when one is given.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or summary_max_concurrency)
+    max_tokens = input_token_budget(doc_type)
+    fanout = []
+
+    async def _reduce(batch):
+        # A batch of one has nothing to combine and moves up a level unchanged
+        if len(batch) == 1:
+            return batch[0]
+        async with semaphore:
+            return await summarize_chunk_async(client, "\n\n".join(batch), doc_type)
+
+    with span("reduce", doc_type=doc_type, summaries=len(summaries)) as current:
+        while len(summaries) > 1:
+            batches = batch_summaries(summaries, max_tokens)
+            fanout.append(max(len(batch) for batch in batches))
+            summaries = await asyncio.gather(*(_reduce(batch) for batch in batches))
+        current.set("depth", len(fanout))
+        current.set("fanout", fanout)
+
+    if report is not None:
+        report["reduce_depth"] = len(fanout)
+        report["reduce_fanout"] = fanout
+    return summaries[0]
+
+
+async def summarize_document_async(file_obj, doc_type, max_concurrency=None, report=None):
+    """Summarize an in-memory document, mapping chunks concurrently before tree-reducing the partial summaries."""
+    with span("summarize_document", doc_type=doc_type) as current:
+        content_key, content = await asyncio.to_thread(read_document, file_obj)
+
+        cache_key = _summary_cache_key("document", content_key, doc_type)
+        cached = get_summary_cache().get(cache_key)
+        current.set("cache_hit", cached is not None)
+        if cached is not None:
+            return cached
+
+        # Each chunk is summarized as soon as it is produced; for PDFs analyzed in page ranges that is
+        # while later ranges are still being analyzed. A single summary needs no reduce step
+        chunks = _traced_chunks(chunk_text(content, doc_type))
+        async with create_async_openai_client() as client:
+            summaries = await map_chunks(client, chunks, doc_type, max_concurrency)
+            if not summaries:
+                # An empty document is summarized as one empty chunk
+                summaries = [await summarize_chunk_async(client, "", doc_type)]
+            final_summary = await reduce_summaries(client, summaries, doc_type, max_concurrency, report)
+            chunk_count = len(summaries)
+        current.set("chunks", chunk_count)
+
+        if report is not None:
+            report["chunks"] = chunk_count
+            report.setdefault("reduce_depth", 0)
+            report.setdefault("reduce_fanout", [])
+
+        summary = save_summary(final_summary, doc_type)
+        get_summary_cache().put(cache_key, "document", summary)
+        return summary
+
+
+def summarize_document(file_obj, doc_type, max_concurrency=None, report=None):
+    """Summarize an in-memory document without saving."""
+    return asyncio.run(summarize_document_async(file_obj, doc_type, max_concurrency, report))
@@ -0,0 +1,121 @@
+from typing import Any, Self
+
+from pydantic import Field
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.contents import AuthorRole, ChatHistory, ChatHistoryReducer, ChatMessageContent
+
+from chunking import get_tokenizer
+
+# Metadata flag marking the running summary message in a reduced history
+SUMMARY_METADATA_KEY = "__running_summary__"
+
+# Author of the running summary; AgentGroupChat rejects system messages, so it is an assistant message
+SUMMARY_AUTHOR = "ConversationSummary"
+
+SUMMARY_INSTRUCTIONS = """
+You maintain the running summary of an RFP evaluation conversation between a user and evaluation agents.
+Merge the existing summary and the new messages into one concise summary. Keep every score, compliance
+finding, risk, recommendation, vendor fact, number and open question, and which agent stated it.
+Drop greetings, repetition and formatting. Respond with the summary only.
+"""
+
+
+class SummarizingHistoryReducer(ChatHistoryReducer):
+    """
+    Chat history reducer that bounds the history by tokens instead of message count.
+
+    The last target_count messages are kept verbatim as far as they fit in the token budget, and the
+    latest message of each pinned agent, e.g. the evaluation report, is always kept. Everything older is
+    folded into a single running summary message, so the prompt stays roughly the same size as the
+    conversation grows. Without a service, or if summarization fails, older messages are clipped instead.
+    """
+
+    service: ChatCompletionClientBase | None = None
+    token_budget: int = Field(default=8000, gt=0)
+    summary_max_tokens: int = Field(default=600, gt=0)
+    pinned_agents: list[str] = Field(default_factory=list)
+    tokenizer: Any = Field(default=None, exclude=True)
+
+    def _tokens(self, message: ChatMessageContent) -> int:
+        if self.tokenizer is None:
+            self.tokenizer = get_tokenizer()
+        # A few tokens of per-message overhead for the role and name
+        return self.tokenizer.count(message.content or "") + 4
+
+    async def reduce(self) -> Self | None:
+        """
+        Fold older messages into the running summary if the history is over its message or token budget.
+
+        :return: The reduced history, or None if no reduction was needed.
+        """
+        messages = self.messages
+        total = sum(self._tokens(message) for message in messages)
+        if len(messages) <= self.target_count + self.threshold_count and total <= self.token_budget:
+            return None
+
+        previous_summary = next((message.content for message in messages if message.metadata.get(SUMMARY_METADATA_KEY)), "")
+        conversation = [message for message in messages if not message.metadata.get(SUMMARY_METADATA_KEY)]
+
+        # Pin the latest message of each pinned agent
+        pinned = set()
+        for agent_name in self.pinned_agents:
+            position = next((index for index in reversed(range(len(conversation)))
+                             if conversation[index].name == agent_name), None)
+            if position is not None:
+                pinned.add(position)
+        used = sum(self._tokens(conversation[index]) for index in pinned) + self.summary_max_tokens
+
+        # Keep the most recent messages verbatim within the budget, always including the last one
+        kept = set(pinned)
+        for index in reversed(range(len(conversation))):
+            if index in pinned:
+                continue
+            recent = len(kept - pinned)
+            cost = self._tokens(conversation[index])
+            if recent and (recent >= self.target_count or used + cost > self.token_budget):
+                break
+            kept.add(index)
+            used += cost
+
+        older = [message for index, message in enumerate(conversation) if index not in kept]
+        if not older:
+            return None
+
+        summary = await self._summarize(previous_summary, older)
+        summary_message = ChatMessageContent(role=AuthorRole.ASSISTANT, name=SUMMARY_AUTHOR,
+                                             content=f"Summary of the earlier conversation:\n{summary}",
+                                             metadata={SUMMARY_METADATA_KEY: True})
+        self.messages = [summary_message] + [message for index, message in enumerate(conversation) if index in kept]
+        return self
+
+    @staticmethod
+    def _transcript(messages: list) -> str:
+        return "\n\n".join(f"{message.name or message.role.value}: {message.content}" for message in messages if message.content)
+
+    async def _summarize(self, previous_summary: str, messages: list) -> str:
+        """
+        Merge messages into the running summary.
+
+        :param previous_summary: The current running summary, possibly empty.
+        :param messages: Messages to fold into the summary.
+        :return: The new running summary.
+        """
+        previous_summary = previous_summary.removeprefix("Summary of the earlier conversation:\n")
+        if self.service is not None:
+            history = ChatHistory()
+            history.add_system_message(SUMMARY_INSTRUCTIONS)
+            history.add_user_message(f"### Existing Summary:\n{previous_summary or 'None'}\n\n"
+                                     f"### New Messages:\n{self._transcript(messages)}")
+            settings = self.service.get_prompt_execution_settings_class()(max_tokens=self.summary_max_tokens)
+            try:
+                response = await self.service.get_chat_message_content(history, settings)
+                if response and response.content:
+                    return response.content
+            except Exception as e:
+                print(f"History summarization failed, clipping older messages instead: {e}")
+
+        # Fallback: keep the start of each older message within the summary budget
+        per_message = max(self.summary_max_tokens // max(len(messages), 1), 20)
+        chars = per_message * 4
+        clipped = [f"{message.name or message.role.value}: {message.content[:chars]}" for message in messages if message.content]
+        return "\n".join(filter(None, [previous_summary, *clipped]))[-self.summary_max_tokens * 4:]
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import threading
+
+
+class LayoutCache:
+    """
+    Content-addressed on-disk cache for Document Intelligence layout results.
+
+    Entries are keyed by a SHA-256 hash of the file bytes plus the model id and stored as
+    plain text files. The total size on disk is bounded; once it is exceeded the least
+    recently used entries are evicted, using each file's modification time as its last access.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """
+        Initialize the layout cache.
+
+        :param cache_dir: Directory the cached layout content is written to.
+        :param max_bytes: Maximum total size of the cached content on disk.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data: bytes, model_id: str) -> str:
+        """
+        Build the cache key for a document.
+
+        :param data: Raw bytes of the uploaded file.
+        :param model_id: Document Intelligence model the content was extracted with.
+        :return: Hex digest identifying the document and model.
+        """
+        digest = hashlib.sha256()
+        digest.update(model_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str):
+        """
+        Look up cached content, marking the entry as recently used.
+
+        :param key: Cache key from make_key.
+        :return: The cached content, or None on a miss.
+        """
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    content = file.read()
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return content
+
+    def put(self, key: str, content: str):
+        """
+        Store content for a key and evict old entries if the cache is over its size limit.
+
+        :param key: Cache key from make_key.
+        :param content: Extracted document content.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        # Oldest access first
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> dict:
+        """
+        Report cache hit/miss statistics.
+
+        :return: Counts of hits, misses and evictions plus the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
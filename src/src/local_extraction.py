@@ -0,0 +1,297 @@
+import io
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# WordprocessingML and markup compatibility namespaces
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+# Engines documents are routed to
+LOCAL_ENGINE = "local"
+DOCUMENT_INTELLIGENCE_ENGINE = "document_intelligence"
+
+# Document types extracted locally unless DOCUMENT_ROUTING says otherwise; everything else goes to Document Intelligence
+DEFAULT_ROUTING = {"txt": LOCAL_ENGINE, "md": LOCAL_ENGINE, "docx": LOCAL_ENGINE}
+
+# Numbering formats rendered as bullets; every other format becomes an ordered list item
+_BULLET_FORMATS = {"bullet", "none"}
+
+_HEADING_STYLE_NAME = re.compile(r"^heading\s*(\d)$")
+
+# Paragraphs that are entirely bold and at most this long are treated as headings without a heading style
+BOLD_HEADING_MAX_CHARS = 100
+
+
+def get_routing() -> dict:
+    """
+    Returns the extraction engine per document type.
+
+    DOCUMENT_ROUTING overrides the defaults with comma-separated type=engine pairs, e.g.
+    "docx=document_intelligence" sends Word documents to Document Intelligence again.
+    """
+    routing = dict(DEFAULT_ROUTING)
+    for pair in os.getenv("DOCUMENT_ROUTING", "").split(","):
+        document_type, _, engine = pair.partition("=")
+        if document_type.strip() and engine.strip():
+            routing[document_type.strip().lower().lstrip(".")] = engine.strip().lower()
+    return routing
+
+
+def detect_document_type(data: bytes, file_name: str = None) -> str:
+    """
+    Detect the type of a document from its content, falling back to the file extension.
+
+    :param data: Document bytes.
+    :param file_name: Name of the uploaded file, if known.
+    :return: Type such as "pdf", "docx" or "txt", or "unknown".
+    """
+    extension = os.path.splitext(file_name or "")[1].lower().lstrip(".")
+    if data.startswith(b"%PDF"):
+        return "pdf"
+    if data.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        return extension or "unknown"
+    if extension:
+        return extension
+    if b"\x00" not in data[:8192]:
+        try:
+            data[:8192].decode("utf-8")
+            return "txt"
+        except UnicodeDecodeError:
+            pass
+    return "unknown"
+
+
+def text_to_markdown(data: bytes) -> str:
+    """Decode a plain text document, which the chunker already splits on blank lines like Markdown."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = data.decode("cp1252", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
+
+
+def _read_styles(archive: zipfile.ZipFile) -> dict:
+    """Map paragraph style ids to their heading level, or to "bullet"/"number" for list styles."""
+    if "word/styles.xml" not in archive.namelist():
+        return {}
+    styles = {}
+    root = ElementTree.fromstring(archive.read("word/styles.xml"))
+    for style in root.iter(f"{_W}style"):
+        style_id = style.get(f"{_W}styleId")
+        name_element = style.find(f"{_W}name")
+        name = (name_element.get(f"{_W}val") if name_element is not None else style_id or "").lower()
+        outline = style.find(f"{_W}pPr/{_W}outlineLvl")
+        heading = _HEADING_STYLE_NAME.match(name)
+        if name == "title":
+            styles[style_id] = 1
+        elif heading:
+            styles[style_id] = int(heading.group(1))
+        elif outline is not None and outline.get(f"{_W}val", "").isdigit() and int(outline.get(f"{_W}val")) < 9:
+            styles[style_id] = int(outline.get(f"{_W}val")) + 1
+        elif name.startswith("list bullet"):
+            styles[style_id] = "bullet"
+        elif name.startswith("list number"):
+            styles[style_id] = "number"
+    return styles
+
+
+def _read_numbering(archive: zipfile.ZipFile) -> dict:
+    """Map (numId, ilvl) pairs of the numbering definitions to their number format, e.g. "bullet" or "decimal"."""
+    if "word/numbering.xml" not in archive.namelist():
+        return {}
+    root = ElementTree.fromstring(archive.read("word/numbering.xml"))
+    abstract_formats = {}
+    for abstract in root.iter(f"{_W}abstractNum"):
+        for level in abstract.iter(f"{_W}lvl"):
+            number_format = level.find(f"{_W}numFmt")
+            abstract_formats[(abstract.get(f"{_W}abstractNumId"), level.get(f"{_W}ilvl"))] = (
+                number_format.get(f"{_W}val") if number_format is not None else "decimal")
+
+    formats = {}
+    for num in root.iter(f"{_W}num"):
+        abstract_id = num.find(f"{_W}abstractNumId")
+        if abstract_id is None:
+            continue
+        for (abstract, level), number_format in abstract_formats.items():
+            if abstract == abstract_id.get(f"{_W}val"):
+                formats[(num.get(f"{_W}numId"), level)] = number_format
+    return formats
+
+
+def _table_to_markdown(rows: list) -> str:
+    """Render table rows as a Markdown table with the first row as the header."""
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    lines = [f"| {' | '.join(rows[0])} |", f"|{' --- |' * width}"]
+    lines.extend(f"| {' | '.join(row)} |" for row in rows[1:])
+    return "\n".join(lines)
+
+
+def docx_to_markdown(data: bytes) -> str:
+    """
+    Convert a .docx document to Markdown without Document Intelligence.
+
+    word/document.xml is parsed as a stream and every finished paragraph and table is released
+    right away, so memory stays flat for large documents. Heading and title styles, and short
+    paragraphs that are entirely bold, become # headings, numbered and bulleted paragraphs become
+    list items and tables become Markdown tables.
+
+    :param data: Bytes of the .docx file.
+    :return: Markdown with blank lines between blocks, like the Document Intelligence output.
+    """
+    blocks = []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        styles = _read_styles(archive)
+        numbering = _read_numbering(archive)
+
+        # One entry per open paragraph and run (text boxes nest them) and per open table, row and cell
+        paragraphs = []
+        runs = []
+        tables = []
+        # Depth of mc:Fallback elements, which repeat the content of the preceding mc:Choice
+        fallback = 0
+
+        with archive.open("word/document.xml") as document:
+            for event, element in ElementTree.iterparse(document, events=("start", "end")):
+                tag = element.tag
+                if tag == f"{_MC}Fallback":
+                    fallback += 1 if event == "start" else -1
+                    continue
+                if fallback:
+                    continue
+
+                if event == "start":
+                    if tag == f"{_W}p":
+                        paragraphs.append({"text": [], "style": None, "num_id": None, "level": "0", "bold": True})
+                    elif tag == f"{_W}r":
+                        runs.append({"bold": False, "text": False})
+                    elif tag == f"{_W}tbl":
+                        tables.append([])
+                    elif tag == f"{_W}tr" and tables:
+                        tables[-1].append([])
+                    elif tag == f"{_W}tc" and tables and tables[-1]:
+                        tables[-1][-1].append([])
+                    continue
+
+                if tag == f"{_W}t" and paragraphs:
+                    paragraphs[-1]["text"].append(element.text or "")
+                    if runs and (element.text or "").strip():
+                        runs[-1]["text"] = True
+                elif tag == f"{_W}b" and runs:
+                    runs[-1]["bold"] = element.get(f"{_W}val", "true") not in ("0", "false")
+                elif tag == f"{_W}r" and runs:
+                    run = runs.pop()
+                    if run["text"] and not run["bold"] and paragraphs:
+                        paragraphs[-1]["bold"] = False
+                elif tag == f"{_W}tab" and paragraphs:
+                    paragraphs[-1]["text"].append(" ")
+                elif tag in (f"{_W}br", f"{_W}cr") and paragraphs:
+                    paragraphs[-1]["text"].append("\n")
+                elif tag == f"{_W}pStyle" and paragraphs:
+                    paragraphs[-1]["style"] = element.get(f"{_W}val")
+                elif tag == f"{_W}numId" and paragraphs:
+                    paragraphs[-1]["num_id"] = element.get(f"{_W}val")
+                elif tag == f"{_W}ilvl" and paragraphs:
+                    paragraphs[-1]["level"] = element.get(f"{_W}val", "0")
+                elif tag == f"{_W}gridSpan" and tables and tables[-1] and tables[-1][-1]:
+                    # A merged cell spans several columns; keep the columns aligned with empty cells
+                    span = element.get(f"{_W}val", "1")
+                    tables[-1][-1][-1].extend([None] * (int(span) - 1 if span.isdigit() else 0))
+                elif tag == f"{_W}p" and paragraphs:
+                    paragraph = paragraphs.pop()
+                    text = "".join(paragraph["text"]).strip()
+                    element.clear()
+                    if not text:
+                        continue
+                    if tables and tables[-1] and tables[-1][-1]:
+                        # Paragraphs of a cell, including nested tables, are joined into the cell text
+                        tables[-1][-1][-1].append(text)
+                        continue
+                    style = styles.get(paragraph["style"])
+                    number_format = numbering.get((paragraph["num_id"], paragraph["level"]))
+                    if isinstance(style, int):
+                        blocks.append(f"{'#' * style} {text}")
+                    elif number_format is not None or style in ("bullet", "number"):
+                        bullet = "-" if number_format in _BULLET_FORMATS or style == "bullet" else "1."
+                        indent = "  " * (int(paragraph["level"]) if paragraph["level"].isdigit() else 0)
+                        blocks.append(f"{indent}{bullet} {text}")
+                    elif paragraph["bold"] and len(text) <= BOLD_HEADING_MAX_CHARS and "\n" not in text:
+                        blocks.append(f"## {text}")
+                    else:
+                        blocks.append(text)
+                elif tag == f"{_W}tbl" and tables:
+                    table = tables.pop()
+                    element.clear()
+                    rows = [[" ".join(part.replace("\n", " ") for part in cell if part).replace("|", "\\|")
+                             for cell in _expand(row)] for row in table if row]
+                    if not rows:
+                        continue
+                    markdown = _table_to_markdown(rows)
+                    if tables and tables[-1] and tables[-1][-1]:
+                        tables[-1][-1][-1].append(markdown.replace("\n", " "))
+                    else:
+                        blocks.append(markdown)
+
+    return _join_blocks(blocks)
+
+
+def _expand(row: list) -> list:
+    """Split the empty placeholder columns of merged cells out of a row's cells."""
+    cells = []
+    for cell in row:
+        cells.append([part for part in cell if part is not None])
+        cells.extend([] for part in cell if part is None)
+    return cells
+
+
+def _join_blocks(blocks: list) -> str:
+    """Join blocks with blank lines, keeping consecutive list items of one list together."""
+    parts = []
+    for index, block in enumerate(blocks):
+        if index:
+            previous_is_item = _is_list_item(blocks[index - 1])
+            parts.append("\n" if previous_is_item and _is_list_item(block) else "\n\n")
+        parts.append(block)
+    return "".join(parts)
+
+
+def _is_list_item(block: str) -> bool:
+    return re.match(r"\s*(?:-|1\.) ", block) is not None
+
+
+def extract_locally(data: bytes, document_type: str, min_chars: int = None) -> str:
+    """
+    Extract the Markdown content of a text or .docx document without Document Intelligence.
+
+    :param data: Document bytes.
+    :param document_type: Type returned by detect_document_type.
+    :param min_chars: Content shorter than this is treated as scanned or image-only, which only
+        Document Intelligence can read; defaults to LOCAL_EXTRACTION_MIN_CHARS.
+    :return: The Markdown content, or None if the document should go to Document Intelligence.
+    """
+    if min_chars is None:
+        min_chars = int(os.getenv("LOCAL_EXTRACTION_MIN_CHARS", "50"))
+    try:
+        if document_type == "docx":
+            content = docx_to_markdown(data)
+        elif document_type in ("txt", "md"):
+            content = text_to_markdown(data)
+        else:
+            return None
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        print(f"Local extraction of the {document_type} document failed, using Document Intelligence instead: {e}")
+        return None
+    return content if len(content.strip()) >= min_chars else None
@@ -0,0 +1,299 @@
+"""
+Offline, in-process stand-in for the Azure AI Search indexes used by the plugins.
+
+The indexes are built from documents/sample-docs/index-creation: the policy PDFs in legal-policy-index
+become chunked documents of the LEGAL_POLICY_INDEX index and supplier-insights-index/Historical-Vendor-Insights.json
+becomes the SUPPLIER_INDEX index, so they are found under the names the deployment configures.
+Embeddings are stored as a NumPy matrix and memory-mapped on load; queries are scored with a hybrid
+of cosine similarity and BM25. Build the indexes ahead of time with
+
+    python local_search.py --source documents/sample-docs/index-creation --output .cache/local-index
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from chunking import get_tokenizer, iter_chunks
+
+SAMPLE_INDEX_SOURCE = os.path.join(os.path.dirname(__file__), "documents", "sample-docs", "index-creation")
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(__file__), ".cache", "local-index")
+
+# Folders of the source directory, by the environment variable naming the index built from them
+SOURCE_FOLDERS = {"LEGAL_POLICY_INDEX": "legal-policy-index", "SUPPLIER_INDEX": "supplier-insights-index"}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens used for BM25 and the hashing embedder."""
+    return _TOKEN.findall(text.lower())
+
+
+class HashingEmbedder:
+    """
+    Deterministic offline embedder using feature hashing of word unigrams and bigrams.
+
+    It needs no model or network access, which makes retrieval reproducible in dev and CI.
+    Any object with the same embed method, e.g. one calling an embeddings deployment, can be used instead.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        """
+        Initialize the embedder.
+
+        :param dimensions: Length of the embedding vectors.
+        """
+        self.dimensions = dimensions
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        :param texts: Texts to embed.
+        :return: L2-normalized float32 matrix with one row per text.
+        """
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                matrix[row, value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+
+def _read_pdf(path: str) -> str:
+    from pypdf import PdfReader
+
+    return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def _supplier_text(record: dict) -> str:
+    return " ".join(" ".join(map(str, value)) if isinstance(value, list) else str(value) for value in record.values())
+
+
+def configured_index_name(variable: str) -> str:
+    """
+    Name of a local index: the configured Azure index name, or its source folder when unset.
+
+    :param variable: LEGAL_POLICY_INDEX or SUPPLIER_INDEX.
+    :return: The index name.
+    """
+    return os.getenv(variable) or SOURCE_FOLDERS[variable]
+
+
+def load_source_documents(source_dir: str) -> dict:
+    """
+    Read the index-creation sample documents.
+
+    :param source_dir: Directory containing one folder per index.
+    :return: Documents per configured index name, each with the search text in "content" plus the index fields.
+    """
+    indexes = {}
+
+    policy_dir = os.path.join(source_dir, SOURCE_FOLDERS["LEGAL_POLICY_INDEX"])
+    if os.path.isdir(policy_dir):
+        tokenizer = get_tokenizer()
+        documents = []
+        for name in sorted(os.listdir(policy_dir)):
+            if name.lower().endswith(".pdf"):
+                text = _read_pdf(os.path.join(policy_dir, name))
+                for chunk in iter_chunks(text, 512, overlap_tokens=64, tokenizer=tokenizer):
+                    documents.append({"content": chunk, "chunk": chunk, "title": name})
+        indexes[configured_index_name("LEGAL_POLICY_INDEX")] = documents
+
+    supplier_path = os.path.join(source_dir, SOURCE_FOLDERS["SUPPLIER_INDEX"], "Historical-Vendor-Insights.json")
+    if os.path.exists(supplier_path):
+        with open(supplier_path, "r", encoding="utf-8") as file:
+            records = json.load(file)
+        indexes[configured_index_name("SUPPLIER_INDEX")] = [
+            {"content": _supplier_text(record), "chunk": record["vendor_name"], **record} for record in records
+        ]
+
+    return indexes
+
+
+def build_local_index(source_dir: str, output_dir: str, embedder=None) -> list:
+    """
+    Build the local indexes from the sample documents.
+
+    :param source_dir: Directory containing one folder per index.
+    :param output_dir: Directory the indexes are written to.
+    :param embedder: Embedder to use; defaults to HashingEmbedder.
+    :return: Names of the indexes built.
+    """
+    embedder = embedder or HashingEmbedder()
+    built = []
+    for index_name, documents in load_source_documents(source_dir).items():
+        index_dir = os.path.join(output_dir, index_name)
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "embeddings.npy"), embedder.embed([doc["content"] for doc in documents]))
+        with open(os.path.join(index_dir, "documents.json"), "w", encoding="utf-8") as file:
+            json.dump(documents, file)
+        built.append(index_name)
+    return built
+
+
+class LocalSearchIndex:
+    """
+    A single memory-mapped local index with hybrid cosine + BM25 scoring.
+    """
+
+    def __init__(self, index_dir: str, embedder=None, vector_weight: float = 0.5, k1: float = 1.5, b: float = 0.75):
+        """
+        Load an index written by build_local_index.
+
+        :param index_dir: Directory of the index.
+        :param embedder: Embedder the index was built with; defaults to HashingEmbedder.
+        :param vector_weight: Weight of the cosine score in the hybrid score; BM25 gets the rest.
+        :param k1: BM25 term frequency saturation.
+        :param b: BM25 length normalization.
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.vector_weight = vector_weight
+        self.k1 = k1
+        self.b = b
+        self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "documents.json"), "r", encoding="utf-8") as file:
+            self.documents = json.load(file)
+
+        # BM25 statistics
+        self._term_counts = [Counter(tokenize(doc["content"])) for doc in self.documents]
+        self._lengths = np.array([sum(counts.values()) for counts in self._term_counts], dtype=np.float32)
+        self._average_length = float(self._lengths.mean()) if len(self._lengths) else 0.0
+        document_frequency = Counter(term for counts in self._term_counts for term in counts)
+        total = len(self.documents)
+        self._idf = {term: math.log(1 + (total - freq + 0.5) / (freq + 0.5)) for term, freq in document_frequency.items()}
+
+    def _bm25(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            frequencies = np.array([counts.get(term, 0) for counts in self._term_counts], dtype=np.float32)
+            norm = self.k1 * (1 - self.b + self.b * self._lengths / (self._average_length or 1))
+            scores += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+        return scores
+
+    @staticmethod
+    def _min_max(scores: np.ndarray) -> np.ndarray:
+        spread = scores.max() - scores.min() if len(scores) else 0
+        return (scores - scores.min()) / spread if spread else np.zeros_like(scores)
+
+    def search_batch(self, queries: list, top: int) -> list:
+        """
+        Score a batch of queries against the index.
+
+        :param queries: Query texts.
+        :param top: Number of results per query.
+        :return: Per query, a list of (document index, hybrid score) pairs, best first.
+        """
+        if not self.documents:
+            return [[] for _ in queries]
+
+        # One matrix product scores every query against every document
+        cosine = self.embedder.embed(queries) @ np.asarray(self.embeddings).T
+        results = []
+        for row, query in enumerate(queries):
+            scores = self.vector_weight * self._min_max(cosine[row]) + (1 - self.vector_weight) * self._min_max(self._bm25(query))
+            count = min(top, len(scores))
+            best = np.argpartition(-scores, count - 1)[:count]
+            best = best[np.argsort(-scores[best])]
+            results.append([(int(index), float(scores[index])) for index in best])
+        return results
+
+
+class _AsyncResults:
+    """Async iterator over search results, matching the paged results of the async Azure client."""
+
+    def __init__(self, documents: list):
+        self._documents = iter(documents)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._documents)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class LocalSearchClient:
+    """
+    Drop-in replacement for azure.search.documents.aio.SearchClient backed by a LocalSearchIndex.
+
+    Only the parts of search used by the plugins are supported; semantic ranking options are accepted and ignored.
+    """
+
+    def __init__(self, index: LocalSearchIndex, index_name: str):
+        """
+        Initialize the local search client.
+
+        :param index: The local index to query.
+        :param index_name: Name of the index, mirroring the Azure client.
+        """
+        self.index = index
+        self._index_name = index_name
+
+    async def search(self, search_text: str = "", vector_queries=None, select=None, top: int = 50, **kwargs):
+        """
+        Run a hybrid search.
+
+        :param search_text: Query text.
+        :param vector_queries: Vector queries; the text of the first one is embedded locally.
+        :param select: Fields to return; all index fields when omitted.
+        :param top: Number of results.
+        :return: Async iterator over the matching documents.
+        """
+        query = vector_queries[0].text if vector_queries else search_text
+        ranked = self.index.search_batch([query or search_text or ""], top)[0]
+        documents = []
+        for position, score in ranked:
+            document = self.index.documents[position]
+            fields = select or [field for field in document if field != "content"]
+            documents.append({**{field: document.get(field) for field in fields}, "@search.score": score})
+        return _AsyncResults(documents)
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_local_search_client(index_name: str) -> LocalSearchClient:
+    """
+    Returns a local search client for an index, building the local indexes from the samples on first use.
+
+    :param index_name: Name of the index as configured in LEGAL_POLICY_INDEX or SUPPLIER_INDEX.
+    :return: Local search client.
+    """
+    index_root = os.getenv("LOCAL_INDEX_DIR") or DEFAULT_INDEX_DIR
+    with _lock:
+        index = _indexes.get(index_name)
+        if index is None:
+            index_dir = os.path.join(index_root, index_name)
+            if not os.path.exists(os.path.join(index_dir, "embeddings.npy")):
+                build_local_index(os.getenv("LOCAL_INDEX_SOURCE") or SAMPLE_INDEX_SOURCE, index_root)
+            if not os.path.exists(os.path.join(index_dir, "embeddings.npy")):
+                raise FileNotFoundError(f"No local index named {index_name}; local indexes are built for "
+                                        f"LEGAL_POLICY_INDEX and SUPPLIER_INDEX")
+            index = _indexes[index_name] = LocalSearchIndex(index_dir)
+    return LocalSearchClient(index, index_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline search indexes from the sample documents.")
+    parser.add_argument("--source", default=SAMPLE_INDEX_SOURCE, help="Directory containing one folder per index.")
+    parser.add_argument("--output", default=DEFAULT_INDEX_DIR, help="Directory the indexes are written to.")
+    args = parser.parse_args()
+    for name in build_local_index(args.source, args.output):
+        print(f"Built {name} in {os.path.join(args.output, name)}")
@@ -1,14 +1,32 @@
 # Standard library imports
 import os
 import uuid
-from time import sleep
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Third-party imports
 import streamlit as st
 from PIL import Image
 
 # Local application imports
-from doc_summarization import summarize_document
+from analysis_store import AnalysisStore, get_analysis_store, restore_session_state
+from tracing import span
+
+
+@st.cache_resource
+def get_document_summarizer():
+    """Imports the summarization pipeline and creates its Document Intelligence client once per process, on first use."""
+    with span("startup", component="summarization"):
+        import doc_summarization
+
+        doc_summarization.get_document_intelligence_client()
+    return doc_summarization.summarize_document
+
+
+@st.cache_resource
+def get_summary_executor():
+    """Process-wide worker pool that summarizes documents in the background, shared by all sessions."""
+    return ThreadPoolExecutor(max_workers=int(os.getenv("SUMMARY_WORKERS", "8")), thread_name_prefix="summarize")
+
 
 st.markdown("""
     <style>
@@ -54,7 +72,14 @@ with col2:
 st.markdown('''''')
 
 if "session_uid" not in st.session_state:
+    # A session UID in the URL resumes a stored analysis after a refresh or restart
+    session_uid = st.query_params.get("session")
+    analysis_store = get_analysis_store()
+    if session_uid and analysis_store and restore_session_state(st.session_state, session_uid, analysis_store):
+        st.session_state.session_uid = session_uid
+        st.switch_page("pages/chat.py")
     st.session_state.session_uid = str(uuid.uuid4())  # Generate a new UID
+st.query_params["session"] = st.session_state.session_uid
 
 # Initialize session state variables
 if "rfp_uploaded" not in st.session_state:
@@ -64,6 +89,10 @@ if "rfp_uploaded" not in st.session_state:
 if "vendor_uploaded" not in st.session_state:
     st.session_state.vendor_uploaded = False
     st.session_state.vendor_file = None
+    st.session_state.vendor_files = []
+
+if "batch_mode" not in st.session_state:
+    st.session_state.batch_mode = False
 
 if "rfp_summary_ready" not in st.session_state:
     st.session_state.rfp_summary_ready = False
@@ -124,12 +153,24 @@ else:
 # **Step 2: Upload Vendor Proposal**
 if st.session_state.rfp_uploaded:
     st.subheader("Step 2: Upload Vendor Proposal Document")
+    st.toggle("Batch mode: evaluate several proposals against this RFP", key="batch_mode",
+              disabled=st.session_state.vendor_uploaded)
     if not st.session_state.vendor_uploaded:
-        vendor_file = st.file_uploader("Upload Vendor Proposal Document", type=["pdf", "docx", "txt"], key="vendor")
-        if vendor_file:
-            st.session_state.vendor_uploaded = True
-            st.session_state.vendor_file = vendor_file
-            st.rerun()
+        if st.session_state.batch_mode:
+            vendor_files = st.file_uploader("Upload Vendor Proposal Documents", type=["pdf", "docx", "txt"],
+                                            accept_multiple_files=True, key="vendors")
+            if vendor_files and st.button("Done uploading", key="vendors_done"):
+                st.session_state.vendor_uploaded = True
+                st.session_state.vendor_files = vendor_files
+                st.rerun()
+        else:
+            vendor_file = st.file_uploader("Upload Vendor Proposal Document", type=["pdf", "docx", "txt"], key="vendor")
+            if vendor_file:
+                st.session_state.vendor_uploaded = True
+                st.session_state.vendor_file = vendor_file
+                st.rerun()
+    elif st.session_state.batch_mode:
+        st.success(f"{len(st.session_state.vendor_files)} Vendor Proposal Documents Uploaded!")
     else:
         st.success("Vendor Proposal Document Uploaded!")
 
@@ -138,36 +179,67 @@ if st.session_state.rfp_uploaded and st.session_state.vendor_uploaded:
     st.subheader("Step 3: Multi-Agent Analysis")
 
     if st.button("Analyze", icon=":material/cycle:",disabled=st.session_state.process_running, key="analyze_button"):
+        if st.session_state.batch_mode:
+            st.switch_page("pages/batch.py")  # Batch evaluation runs on its own page
         st.session_state.process_running = True  # Mark process as running
         st.rerun()  # Rerun to trigger processing
 
 # **Processing Steps (Runs After Rerun)**
 if st.session_state.process_running:
     
-    # Step 1: Summarizing RFP
-    if not st.session_state.rfp_summary_ready:
-        with st.spinner("Summarizing RFP Document..."):
-            st.session_state.rfp_summary_ready = summarize_document(st.session_state.rfp_file, "rfp")
-            st.rerun()
-
-    # Step 2: Summarizing Vendor Proposal
-    if st.session_state.rfp_summary_ready and not st.session_state.vendor_summary_ready:
-        with st.spinner("Summarizing Vendor Proposal Document..."):
-            st.session_state.vendor_summary_ready = summarize_document(st.session_state.vendor_file, "proposal")
-            st.rerun()
+    # Steps 1 & 2: Summarize the RFP and Vendor Proposal in parallel
+    if not (st.session_state.rfp_summary_ready and st.session_state.vendor_summary_ready):
+        if "summary_futures" not in st.session_state:
+            analysis_store = get_analysis_store()
+            if analysis_store:
+                analysis_store.start_session(st.session_state.session_uid,
+                                             AnalysisStore.document_hash(st.session_state.rfp_file),
+                                             AnalysisStore.document_hash(st.session_state.vendor_file))
+                # The same documents were already summarized in another session
+                stored = analysis_store.get_analysis(st.session_state.session_uid)
+                if stored.get("rfp_summary") and stored.get("proposal_summary"):
+                    st.session_state.rfp_summary_ready = stored["rfp_summary"]
+                    st.session_state.vendor_summary_ready = stored["proposal_summary"]
+                    st.rerun()
+            executor = get_summary_executor()
+            summarize_document = get_document_summarizer()
+            st.session_state.summary_futures = {
+                "rfp": executor.submit(summarize_document, st.session_state.rfp_file, "rfp"),
+                "proposal": executor.submit(summarize_document, st.session_state.vendor_file, "proposal"),
+            }
+        futures = st.session_state.summary_futures
+
+        pending = {label: futures[key] for label, key in (("RFP", "rfp"), ("Vendor Proposal", "proposal")) if not futures[key].done()}
+        if pending:
+            with st.spinner(f"Summarizing {' and '.join(pending)} Document{'s' if len(pending) > 1 else ''}..."):
+                # Wake up as soon as either summary finishes so the progress bar advances
+                wait(pending.values(), return_when=FIRST_COMPLETED)
+
+        try:
+            if futures["rfp"].done() and not st.session_state.rfp_summary_ready:
+                st.session_state.rfp_summary_ready = futures["rfp"].result()
+            if futures["proposal"].done() and not st.session_state.vendor_summary_ready:
+                st.session_state.vendor_summary_ready = futures["proposal"].result()
+        except Exception:
+            # Let the user retry with a fresh submission
+            del st.session_state.summary_futures
+            st.session_state.process_running = False
+            raise
+
+        if st.session_state.rfp_summary_ready and st.session_state.vendor_summary_ready:
+            del st.session_state.summary_futures
+            analysis_store = get_analysis_store()
+            if analysis_store:
+                analysis_store.update_analysis(st.session_state.session_uid,
+                                               rfp_summary=st.session_state.rfp_summary_ready,
+                                               proposal_summary=st.session_state.vendor_summary_ready)
+        st.rerun()
 
     # Step 3: Generating Chat Instance
     if st.session_state.rfp_summary_ready and st.session_state.vendor_summary_ready and not st.session_state.chat_ready:
-        with st.spinner("Generating Chat Instance..."):
-            sleep(3)
-            st.session_state.chat_ready = True
-            st.rerun()
+        st.session_state.chat_ready = True
 
     # Step 4: Redirect to Analysis Page
     if st.session_state.chat_ready:
-        with st.spinner("All set..."):
-            sleep(1)
-        with st.spinner("Redirecting to Analysis Page..."):
-            sleep(2)
         st.session_state.process_running = False  # Reset process flag
         st.switch_page("pages/chat.py")
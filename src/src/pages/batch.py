@@ -0,0 +1,65 @@
+# Standard library imports
+import asyncio
+from time import sleep
+
+# Third-party imports
+import streamlit as st
+
+# Application-specific imports
+from batch_evaluation import evaluate_proposals, rank_results
+
+st.set_page_config(layout="wide")
+
+# Define agent logos (ensures correct representation)
+AGENT_LOGOS = {
+    "RFPCompliance": "📜",
+    "LegalCompliance": "⚖️",
+    "VendorEvaluation": "🏢",
+    "MarketIntelligence": "📊",
+    "NegotiationStrategy": "🤝",
+    "EvaluationReport": "📑"
+}
+
+# Comparison table column headers
+TABLE_COLUMNS = {
+    "rank": "Rank",
+    "vendor_name": "Vendor",
+    "final_score": "Final Score",
+    "rfp_compliance_score": "RFP Compliance",
+    "legal_risk": "Legal Risk",
+    "vendor_reputation_score": "Vendor Reputation",
+    "market_risk": "Market Risk",
+    "negotiation_approach": "Negotiation Approach",
+}
+
+if "session_uid" not in st.session_state or not st.session_state.get("vendor_files"):
+    st.warning("❌ No batch of proposals found! Redirecting to home page...")
+    sleep(2)
+    st.switch_page("main.py")  # Redirect to home page
+
+st.title("Batch Proposal Evaluation")
+
+if "batch_results" not in st.session_state:
+    with st.status(f"Evaluating {len(st.session_state.vendor_files)} proposals...", expanded=True) as status:
+        st.session_state.batch_results = asyncio.run(
+            evaluate_proposals(st.session_state.rfp_file, st.session_state.vendor_files, progress=st.write)
+        )
+        status.update(label="Batch evaluation complete", state="complete", expanded=False)
+
+batch = st.session_state.batch_results
+
+st.subheader("Ranked Comparison")
+ranking = rank_results(batch["results"])
+st.dataframe([{TABLE_COLUMNS[key]: value for key, value in row.items()} for row in ranking],
+             hide_index=True, use_container_width=True)
+
+with st.expander("📄 RFP Summary"):
+    st.write(batch["rfp_summary"])
+
+st.subheader("Vendor Reports")
+for result in batch["results"]:
+    with st.expander(f"🏢 {result['vendor_name']}"):
+        for response in result["responses"]:
+            with st.chat_message("assistant", avatar=AGENT_LOGOS.get(response["role"], "🤖")):
+                st.markdown(f"**{response['role']} Agent:**")
+                st.markdown(response["content"])
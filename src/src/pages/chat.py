@@ -1,39 +1,20 @@
 # Standard library imports
 import asyncio
-import json
 import os
 import pathlib
+import queue
 import sys
-import time
+import threading
 from time import sleep
 
 # Third-party imports
 import streamlit as st
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
 from dotenv import load_dotenv
 from streamlit_option_menu import option_menu
 
-# Semantic Kernel imports
-from semantic_kernel import Kernel
-from semantic_kernel.agents import AgentGroupChat, ChatCompletionAgent
-from semantic_kernel.agents.strategies import (
-    KernelFunctionSelectionStrategy,
-    KernelFunctionTerminationStrategy,
-)
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
-from semantic_kernel.contents import ChatHistoryTruncationReducer
-from semantic_kernel.functions import KernelFunctionFromPrompt
-
 # Application-specific imports
-from app import (
-    create_kernel,
-    get_agent_prompts,
-    AGENT_NAMES,
-)
-from plugins.legal_compliance_plugin import LegalCompliancePlugin
-from plugins.vendor_evaluation_plugin import VendorEvaluationPlugin
-from plugins.market_intelligence_plugin import MarketIntelligencePlugin
+from analysis_store import get_analysis_store, restore_session_state
+from tracing import span
 # from speech import transcribe_real_time_audio
 
 # Custom config
@@ -51,160 +32,47 @@ def load_css(file_name):
 css_path = pathlib.Path("style.css")
 load_css(css_path)
 
-legal_policy_index = os.getenv("LEGAL_POLICY_INDEX")
-supplier_insights_index = os.getenv("SUPPLIER_INDEX")
-# Function to initialize the chat system
-async def initialize_chat():
-
-    kernel = create_kernel()
-    prompt_instructions = get_agent_prompts()
-    rfp_summary = st.session_state.rfp_summary_ready
-    proposal_summary = st.session_state.vendor_summary_ready
-    market_intelligence_dataset = os.path.join(os.path.dirname(__file__), "..", "documents", "market-intelligence.json")
-    market_intelligence_dataset = os.path.abspath(market_intelligence_dataset)
-
-    ###########################################################################################
-
-    # For Legal Compliance Agent...
-    legal_search_client = SearchClient(endpoint=os.environ.get("AZURE_AI_SEARCH_ENDPOINT"), 
-                                       index_name=legal_policy_index, 
-                                       credential=AzureKeyCredential(os.environ.get("AZURE_AI_SEARCH_API_KEY")))                      
-    legal_compliance_plugin = LegalCompliancePlugin(search_client=legal_search_client, vendor_legal_summary=proposal_summary.get("legal_summary", ""))
-    policy_context = await legal_compliance_plugin.check_compliance()
-
-    # For Vendor Evaluation Agent...
-    vendor_search_client = SearchClient(endpoint=os.environ.get("AZURE_AI_SEARCH_ENDPOINT"), 
-                                          index_name=supplier_insights_index, 
-                                          credential=AzureKeyCredential(os.environ.get("AZURE_AI_SEARCH_API_KEY")))
-    vendor_evaluation_plugin = VendorEvaluationPlugin(search_client=vendor_search_client, vendor_name=proposal_summary.get("vendor_name", "Unknown Vendor"))
-    vendor_insights = await vendor_evaluation_plugin.get_vendor_insights()
-
-    # For Market Intelligence Agent...
-    market_intelligence_plugin = MarketIntelligencePlugin(market_intelligence_dataset)
-    market_insights = market_intelligence_plugin.get_market_insights("Cloud Computing")
-
-    ###########################################################################################
-
-    # Create agents
-    rfp_compliance_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["rfp_compliance"],
-        instructions=f"{prompt_instructions['rfp_compliance']}\n\n### RFP Summary:\n{rfp_summary}\n### Proposal Summary:\n{proposal_summary.get('overall_summary', 'No overall summary provided.')}"
-    )
-    
-    legal_compliance_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["legal_compliance"],
-        instructions=f"{prompt_instructions['legal_compliance']}\n\n### Vendor Legal Summary:\n{proposal_summary.get('legal_summary', '')}\n\n### Retrieved Policy Context:\n{policy_context}"
-    )
-    
-    vendor_evaluation_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["vendor_evaluation"],
-        instructions=f"{prompt_instructions['vendor_evaluation']}\n\n### Vendor Insights:\n{vendor_insights}"
-    )
-
-    market_intelligence_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["market_intelligence"],
-        instructions=f"{prompt_instructions['market_intelligence']}\n\n### Market Insights:\n{market_insights}"
-    )
-
-    negotiation_strategy_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["negotiation_strategy"],
-        instructions=f"{prompt_instructions['negotiation_strategy']}"
-    )
-    
-    evaluation_report_agent = ChatCompletionAgent(
-        kernel=kernel,
-        name=AGENT_NAMES["evaluation_report"],
-        instructions=f"{prompt_instructions['evaluation_report']}"
-    )
-
-    ###########################################################################################
-
-    # Define a selection function to determine which agent should take the next turn.
-    selection_function = KernelFunctionFromPrompt(
-    function_name="selection",
-    prompt=f"""
-    You are responsible for selecting the next agent in the workflow.
-    Examine the provided RESPONSE and choose the next participant.
-    State only the name of the chosen participant without explanation.
-    Never choose the participant named in the RESPONSE.
-
-    ### Rules:
-    - If the user has just started, follow this strict sequence:
-      1. First, call {AGENT_NAMES["rfp_compliance"]}.
-      2. Next, call {AGENT_NAMES["legal_compliance"]}.
-      3. Then, call {AGENT_NAMES["vendor_evaluation"]}.
-      4. Then, call {AGENT_NAMES["market_intelligence"]}.
-      5. Then, call {AGENT_NAMES["negotiation_strategy"]}.
-      6. Finally, call {AGENT_NAMES["evaluation_report"]}.
-    - **Do NOT skip any agent in the sequence.**
-    - **Each agent runs exactly ONCE but AT LEAST once during evaluation.**
-    
-    - After the full evaluation is complete:
-      - If the user asks about **compliance issues**, select {AGENT_NAMES["legal_compliance"]}.
-      - If the user asks about **vendor history, reputation, or credibility**, select {AGENT_NAMES["vendor_evaluation"]}.
-      - If the user asks about **industry insights or trends**, select {AGENT_NAMES["market_intelligence"]}.
-      - If the user asks about **negotiation recommendations**, select {AGENT_NAMES["negotiation_strategy"]}.
-      - If the user asks about **the final report or modifications**, select {AGENT_NAMES["evaluation_report"]}.
-      - If unsure, default to {AGENT_NAMES["evaluation_report"]}.
-
-    RESPONSE:
-    {{{{$lastmessage}}}}
-    """,
-    )
+# The agent backend pulls in Semantic Kernel, so it is only imported once the chat is shown
+@st.cache_resource
+def get_agent_backend():
+    """Imports the agent backend and compiles the agent prompts once per process."""
+    with span("startup", component="agents"):
+        import app
 
-    # Define a termination function where the final agent signals completion.
-    termination_keyword = "yes"
-    termination_function = KernelFunctionFromPrompt(
-        function_name="termination",
-        prompt=f"""
-       If all checks and evaluations are completed, respond 'yes'. Otherwise, respond 'no'.
+        app.get_agent_prompts()
+    return app
 
-        RESPONSE:
-        {{{{$lastmessage}}}}
-        """,
-    )
 
-    history_reducer = ChatHistoryTruncationReducer(target_count=10)
-
-    # Create the AgentGroupChat with selection and termination strategies.
-    chat = AgentGroupChat(
-        agents=[rfp_compliance_agent, legal_compliance_agent, vendor_evaluation_agent, evaluation_report_agent, market_intelligence_agent, negotiation_strategy_agent],
-        selection_strategy=KernelFunctionSelectionStrategy(
-            initial_agent=rfp_compliance_agent,
-            function=selection_function,
-            kernel=kernel,
-            result_parser=lambda result: (
-                next(
-                    (agent for agent in AGENT_NAMES.values() if agent.lower() == str(result.value[0]).strip().lower()),
-                    AGENT_NAMES["evaluation_report"],
-                    )
-                ),
-            history_variable_name="lastmessage",
-            history_reducer=history_reducer,
-        ),
-        termination_strategy=KernelFunctionTerminationStrategy(
-            agents=[evaluation_report_agent],
-            function=termination_function,
-            kernel=kernel,
-            result_parser=lambda result: termination_keyword in str(result.value[0]).strip().lower(),
-            history_variable_name="lastmessage",
-            maximum_iterations=6,
-            history_reducer=history_reducer,
-        ),
-    )
+# Function to initialize the chat system
+async def initialize_chat():
+    """Builds the group chat, reusing stored agent context and replaying the stored transcript."""
+    backend = get_agent_backend()
+    analysis_store = get_analysis_store()
+    analysis = analysis_store.get_analysis(st.session_state.session_uid) if analysis_store else {}
+    context = analysis.get("context")
+    if context is None:
+        context = await backend.retrieve_context(st.session_state.rfp_summary_ready, st.session_state.vendor_summary_ready)
+        if analysis_store:
+            analysis_store.update_analysis(st.session_state.session_uid, context=context)
+
+    chat = await backend.initialize_chat(st.session_state.rfp_summary_ready, st.session_state.vendor_summary_ready, **context)
+    if st.session_state.get("responses"):
+        await backend.restore_history(chat, st.session_state.responses)
     return chat
 
 
 # Initialize session state for chat
 if "session_uid" not in st.session_state:
-    st.warning("❌ No session UID found! Redirecting to home page...")
-    sleep(2)
-    st.switch_page("main.py")  # Redirect to home page
+    # Resume a stored analysis after a refresh or restart
+    session_uid = st.query_params.get("session")
+    analysis_store = get_analysis_store()
+    if session_uid and analysis_store and restore_session_state(st.session_state, session_uid, analysis_store):
+        st.session_state.session_uid = session_uid
+    else:
+        st.warning("❌ No session UID found! Redirecting to home page...")
+        sleep(2)
+        st.switch_page("main.py")  # Redirect to home page
+st.query_params["session"] = st.session_state.session_uid
     
 if "chat" not in st.session_state:
     st.session_state.chat = None
@@ -267,12 +135,26 @@ image_path3 = os.path.join(os.path.dirname(__file__), "..", "static", "image3.pn
 # Welcome message variable
 WELCOME_MESSAGE = "Hello! Welcome to the Group Agent Chat System. Feel free to ask any questions and our agents will respond!"
 
-# Function to simulate typewriter effect with a delay
-def slow_stream(content, delay=0.05):
-    """Streams content one character at a time with a delay."""
-    for char in content:
-        yield char
-        time.sleep(delay)  # Adds delay to slow down streaming
+# Function to consume an async iterator from the synchronous Streamlit script
+def iter_async(make_async_iterator):
+    """Runs an async iterator on a background event loop and yields its items as they arrive."""
+    items = queue.Queue()
+    done = object()
+
+    async def drain():
+        try:
+            async for item in make_async_iterator():
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+        finally:
+            items.put(done)
+
+    threading.Thread(target=asyncio.run, args=(drain(),), daemon=True).start()
+    while (item := items.get()) is not done:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
 
 lang_code = "en-US"
 if selected == "chat":
@@ -306,6 +188,8 @@ if selected == "chat":
             with st.chat_message("assistant", avatar=agent_logo):
                 st.markdown(f"**{role} Agent:**")  
                 st.markdown(content)
+                if response.get("ttft") is not None:
+                    st.caption(f"Time to first token: {response['ttft']:.2f}s")
 
     # Handle new user input
     prompt = st.chat_input("Enter your message:", key="chat_input")      
@@ -318,21 +202,35 @@ if selected == "chat":
 
         # Append new user message correctly to session history
         st.session_state.responses.append({"role": "user", "content": prompt})
-        asyncio.run(st.session_state.chat.add_chat_message(message=prompt))
 
-        # Stream responses one by one using st.write_stream
-        async def stream_agent_responses():
-            async for response in st.session_state.chat.invoke():
-                if response and response.name:
-                    agent_name = response.name.strip()  
-                    agent_logo = AGENT_LOGOS.get(agent_name, "🤖")  
+        # Stream each agent's tokens as they arrive using st.write_stream
+        ttft = {}
+        # Session state and cached resources only work in the script thread; pass plain objects to the worker
+        backend = get_agent_backend()
+        chat = st.session_state.chat
+        events = iter_async(lambda: backend.invoke_chat_stream(chat, prompt, ttft))
+        lookahead = [next(events, None)]
+
+        def agent_tokens(agent_name):
+            """Yields tokens until the next agent starts answering."""
+            while lookahead[0] is not None and lookahead[0][0] == agent_name:
+                yield lookahead[0][1]
+                lookahead[0] = next(events, None)
+
+        while lookahead[0] is not None:
+            agent_name = lookahead[0][0]
+            agent_logo = AGENT_LOGOS.get(agent_name, "🤖")
+
+            with st.chat_message("assistant", avatar=agent_logo):
+                st.markdown(f"**{agent_name} Agent:**")
+                content = st.write_stream(agent_tokens(agent_name))
+                st.caption(f"Time to first token: {ttft.get(agent_name, 0):.2f}s")
 
-                    with st.chat_message("assistant", avatar=agent_logo):
-                        st.markdown(f"**{agent_name} Agent:**")  
-                        st.write_stream(slow_stream(response.content, delay=0.005))  
+            st.session_state.responses.append({"role": agent_name, "content": content, "ttft": ttft.get(agent_name)})
 
-                    st.session_state.responses.append({"role": response.name, "content": response.content})
+        analysis_store = get_analysis_store()
+        if analysis_store:
+            analysis_store.save_transcript(st.session_state.session_uid, st.session_state.responses)
 
-        asyncio.run(stream_agent_responses())
         st.session_state.chat_process_running = False  # Reset the flag after processing
         st.rerun()
\ No newline at end of file
@@ -1,20 +1,27 @@
-from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import VectorizableTextQuery, VectorFilterMode, QueryType, QueryCaptionType, QueryAnswerType
 
+from retrieval_cache import RetrievalCache
+from tracing import current_span
+
 class LegalCompliancePlugin:
     """
     Plugin to assess vendor legal compliance by retrieving relevant policies as per the vendor proposal's legal summary.
     """
 
-    def __init__(self, search_client: SearchClient, vendor_legal_summary: str):
+    def __init__(self, search_client: SearchClient, vendor_legal_summary: str, index_name: str = "", cache: RetrievalCache = None):
         """
         Initialize the Legal Compliance Plugin.
 
-        :param search_client: Azure AI Search client instance.
+        :param search_client: Async Azure AI Search client instance.
         :param vendor_legal_summary: The legal-related section of the vendor proposal.
+        :param index_name: Name of the policy index, used to key cached results.
+        :param cache: Optional shared cache of retrieved policy chunks.
         """
         self.search_client = search_client
         self.vendor_legal_summary = vendor_legal_summary
+        self.index_name = index_name
+        self.cache = cache
 
     async def check_compliance(self) -> str:
         """
@@ -24,6 +31,30 @@ class LegalCompliancePlugin:
         :return: Retrieved legal policy context.
         """
 
+        cache_key = RetrievalCache.make_key(self.index_name, self.vendor_legal_summary,
+                                            {"k_nearest_neighbors": 50, "select": ["chunk"], "top": 5})
+        chunks = self.cache.get(cache_key) if self.cache else None
+        current_span().set("cache_hit", chunks is not None)
+        if chunks is None:
+            chunks = await self._search_policies()
+            if self.cache and chunks:
+                self.cache.put(cache_key, chunks)
+
+        current_span().set("documents", len(chunks))
+        # Extract retrieved policy content for context
+        policy_context = "\n\n".join(chunks)
+
+        if not policy_context:
+            return "No relevant legal policies found. Ensure the policies are indexed correctly."
+
+        return policy_context
+
+    async def _search_policies(self) -> list:
+        """
+        Retrieve the policy chunks closest to the vendor's legal summary from the search index.
+
+        :return: Retrieved policy chunks.
+        """
         # Retrieve policy documents from the Azure AI Search index
         vector_query = VectorizableTextQuery(
             text=self.vendor_legal_summary,
@@ -32,7 +63,7 @@ class LegalCompliancePlugin:
             exhaustive=True
         )
 
-        results = self.search_client.search(
+        results = await self.search_client.search(
             search_text=self.vendor_legal_summary,
             vector_queries=[vector_query],
             select=["chunk"], 
@@ -43,10 +74,4 @@ class LegalCompliancePlugin:
             top=5
         )
 
-        # Extract retrieved policy content for context
-        policy_context = "\n\n".join([doc["chunk"] for doc in results])
-
-        if not policy_context:
-            return "No relevant legal policies found. Ensure the policies are indexed correctly."
-
-        return policy_context
\ No newline at end of file
+        return [doc["chunk"] async for doc in results]
\ No newline at end of file
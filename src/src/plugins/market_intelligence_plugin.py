@@ -1,19 +1,35 @@
 import json
 import os
+import re
+import threading
+from collections import Counter
 
-class MarketIntelligencePlugin:
+# Words ignored when deriving keywords from industry names
+_STOPWORDS = {"and", "of", "the", "for", "services", "industry"}
+
+
+class MarketIntelligenceStore:
     """
-    Plugin to retrieve market intelligence insights based on industry data.
+    Process-wide store of the market intelligence dataset.
+
+    The dataset is parsed once and reloaded when the file's modification time changes. Reports are
+    rendered when the dataset is loaded, and a keyword index built from the industry names and their
+    optional "keywords" lists is used to detect the industries an RFP is about. Keywords should be
+    specific to the industry; terms like "security" appear in nearly every RFP.
     """
 
     def __init__(self, dataset_path: str):
         """
-        Initialize the Market Intelligence Plugin.
+        Initialize the market intelligence store.
 
         :param dataset_path: Path to the static JSON dataset.
         """
         self.dataset_path = dataset_path
-        self.market_data = self._load_market_data()
+        self._loaded = False
+        self._mtime = None
+        self._reports = {}
+        self._keywords = {}
+        self._lock = threading.Lock()
 
     def _load_market_data(self):
         """
@@ -30,19 +46,16 @@ class MarketIntelligencePlugin:
             print(f"Failed to parse market intelligence dataset: {e}")
             return {}
 
-    def get_market_insights(self, industry: str):
+    @staticmethod
+    def _render_report(industry: str, industry_data: dict) -> str:
         """
-        Retrieves market insights for the specified industry.
+        Render the market intelligence report for an industry.
 
-        :param industry: The industry name to look up.
+        :param industry: The industry name.
+        :param industry_data: The industry's entry in the dataset.
         :return: A structured market intelligence report.
         """
-        industry_data = self.market_data.get(industry, None)
-
-        if not industry_data:
-            return f"No market intelligence data available for {industry}."
-
-        insights = (
+        return (
             f"### Market Intelligence Report for {industry}\n\n"
             f"**Industry Trends:**\n- " + "\n- ".join(industry_data["trends"]) + "\n\n"
             f"**Competitor Insights:**\n- " + "\n- ".join(industry_data["competitor_insights"]) + "\n\n"
@@ -50,4 +63,103 @@ class MarketIntelligencePlugin:
             f"**Regulatory Changes:**\n- " + "\n- ".join(industry_data["regulatory_changes"]) + "\n"
         )
 
-        return insights
\ No newline at end of file
+    def _refresh(self):
+        """Reload the dataset if the file changed, appeared or disappeared since it was last loaded."""
+        try:
+            mtime = os.path.getmtime(self.dataset_path)
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            # A missing file keeps a None mtime, so it is only reported once until it appears
+            if self._loaded and mtime == self._mtime:
+                return
+            market_data = self._load_market_data()
+            self._reports = {industry: self._render_report(industry, data) for industry, data in market_data.items()}
+            self._keywords = {}
+            for industry, data in market_data.items():
+                keywords = {word for word in re.findall(r"[a-z0-9-]+", industry.lower()) if word not in _STOPWORDS}
+                keywords.add(industry.lower())
+                keywords.update(keyword.lower() for keyword in data.get("keywords", []))
+                self._keywords[industry] = re.compile(
+                    r"\b(" + "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)) + r")\b")
+            self._mtime = mtime
+            self._loaded = True
+
+    def get_report(self, industry: str):
+        """
+        Returns the pre-rendered report for an industry.
+
+        :param industry: The industry name to look up.
+        :return: The report, or None if the industry is not in the dataset.
+        """
+        self._refresh()
+        return self._reports.get(industry)
+
+    def detect_industries(self, text: str, limit: int = 2, min_matches: int = 2) -> list:
+        """
+        Detect the industries a text is about.
+
+        :param text: Text to classify, e.g. the RFP summary.
+        :param limit: Maximum number of industries returned.
+        :param min_matches: Keyword matches an industry needs, so a passing mention doesn't count.
+        :return: Industry names ordered by the number of keyword matches, best first.
+        """
+        self._refresh()
+        text = (text or "").lower()
+        scores = Counter({industry: len(pattern.findall(text)) for industry, pattern in self._keywords.items()})
+        return [industry for industry, score in scores.most_common(limit) if score >= min_matches]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_market_store(dataset_path: str) -> MarketIntelligenceStore:
+    """Returns the process-wide market intelligence store for a dataset."""
+    path = os.path.abspath(dataset_path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = MarketIntelligenceStore(path)
+        return store
+
+
+class MarketIntelligencePlugin:
+    """
+    Plugin to retrieve market intelligence insights based on industry data.
+    """
+
+    def __init__(self, dataset_path: str):
+        """
+        Initialize the Market Intelligence Plugin.
+
+        :param dataset_path: Path to the static JSON dataset, shared by every plugin using the same path.
+        """
+        self.dataset_path = dataset_path
+        self.store = get_market_store(dataset_path)
+
+    def detect_industries(self, text: str, limit: int = 2, min_matches: int = 2) -> list:
+        """
+        Detect the industries a text is about.
+
+        :param text: Text to classify, e.g. the RFP summary.
+        :param limit: Maximum number of industries returned.
+        :param min_matches: Keyword matches an industry needs.
+        :return: Industry names, best first.
+        """
+        return self.store.detect_industries(text, limit, min_matches)
+
+    def get_market_insights(self, industry: str):
+        """
+        Retrieves market insights for the specified industry.
+
+        :param industry: The industry name to look up.
+        :return: A structured market intelligence report.
+        """
+        insights = self.store.get_report(industry)
+
+        if not insights:
+            return f"No market intelligence data available for {industry}."
+
+        return insights
@@ -1,20 +1,43 @@
-from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient
 from azure.search.documents.models import VectorizableTextQuery, QueryType, QueryCaptionType, QueryAnswerType
 
+from retrieval_cache import RetrievalCache
+from tracing import current_span
+from vendor_name_index import VendorNameIndex, name_similarity
+
+# Fields of the supplier record used to build the insights
+VENDOR_FIELDS = ["chunk", "past_clients", "industries_served", "customer_satisfaction_avg",
+                 "financial_growth_5y", "compliance_issues", "market_growth", "bbb_accreditation",
+                 "contract_disputes", "notes"]
+
 class VendorEvaluationPlugin:
     """
     Plugin to assess vendor credibility by retrieving historical insights from Azure AI Search.
+
+    When a vendor name index is given, the vendor is first resolved in memory by exact or fuzzy
+    name match and the search service is only queried on a miss. The search always returns its
+    nearest record, so a hit whose name is less similar than the match threshold is discarded.
     """
 
-    def __init__(self, search_client: SearchClient, vendor_name: str):
+    def __init__(self, search_client: SearchClient, vendor_name: str, index_name: str = "", cache: RetrievalCache = None,
+                 name_index: VendorNameIndex = None, match_threshold: float = 0.6):
         """
         Initialize the vendor Evaluation Plugin.
 
-        :param search_client: Azure AI Search client instance.
+        :param search_client: Async Azure AI Search client instance.
         :param vendor_name: Name of the vendor being evaluated.
+        :param index_name: Name of the supplier index, used to key cached results.
+        :param cache: Optional shared cache of retrieved vendor records.
+        :param name_index: Optional in-memory index of supplier names.
+        :param match_threshold: Minimum name similarity of a search hit to the vendor name.
         """
         self.search_client = search_client
         self.vendor_name = vendor_name
+        self.index_name = index_name
+        self.cache = cache
+        self.name_index = name_index
+        self.match_threshold = match_threshold
+        self.match_confidence = None
 
     async def get_vendor_insights(self) -> str:
         """
@@ -23,6 +46,51 @@ class VendorEvaluationPlugin:
         :return: Retrieved historical insights about the vendor.
         """
 
+        vendor_record = self._resolve_vendor()
+        current_span().set("name_index_hit", vendor_record is not None)
+        if vendor_record is None:
+            cache_key = RetrievalCache.make_key(self.index_name, self.vendor_name, {"select": VENDOR_FIELDS, "top": 1})
+            vendor_record = self.cache.get(cache_key) if self.cache else None
+            current_span().set("cache_hit", vendor_record is not None)
+            if vendor_record is None:
+                vendor_record = await self._search_vendor()
+                if self.cache and vendor_record:
+                    self.cache.put(cache_key, vendor_record)
+            # The search always returns its nearest record, so rate how well its name matches
+            if vendor_record:
+                self.match_confidence = name_similarity(self.vendor_name, vendor_record["chunk"])
+                if self.match_confidence < self.match_threshold:
+                    print(f"Ignoring supplier record '{vendor_record['chunk']}' for vendor '{self.vendor_name}': "
+                          f"name match confidence {self.match_confidence:.0%}")
+                    vendor_record = None
+        
+        if self.match_confidence is not None:
+            current_span().set("match_confidence", self.match_confidence)
+        if not vendor_record:
+            return "No historical data found for this vendor. Ensure the index is correctly populated."
+        
+        return self._format_insights(vendor_record, self.match_confidence)
+
+    def _resolve_vendor(self):
+        """
+        Resolve the vendor in the in-memory name index.
+
+        :return: The supplier record as a dict, or None if the name is not confidently matched.
+        """
+        if self.name_index is None:
+            return None
+        record, confidence = self.name_index.resolve(self.vendor_name)
+        if record is None:
+            return None
+        self.match_confidence = confidence
+        return {**{field: record.get(field) for field in VENDOR_FIELDS}, "chunk": record.get(self.name_index.name_field)}
+
+    async def _search_vendor(self):
+        """
+        Retrieve the supplier record closest to the vendor name from the search index.
+
+        :return: The supplier record as a dict, or None if nothing was found.
+        """
         # Vectorize the vendor name and perform search
         vector_query = VectorizableTextQuery(
             text=self.vendor_name,
@@ -31,12 +99,10 @@ class VendorEvaluationPlugin:
             exhaustive=True
         )
 
-        results = self.search_client.search(
+        results = await self.search_client.search(
             search_text=self.vendor_name,
             vector_queries=[vector_query],
-            select=["chunk", "past_clients", "industries_served", "customer_satisfaction_avg", 
-                    "financial_growth_5y", "compliance_issues", "market_growth", "bbb_accreditation",
-                    "contract_disputes", "notes"],
+            select=VENDOR_FIELDS,
             query_type=QueryType.SEMANTIC,
             semantic_configuration_name="supplier-insights-index-semantic-configuration",
             query_caption=QueryCaptionType.EXTRACTIVE,
@@ -44,11 +110,19 @@ class VendorEvaluationPlugin:
             top=1
         )
 
-        vendor_record = next(iter(results), None)
-        
-        if not vendor_record:
-            return "No historical data found for this vendor. Ensure the index is correctly populated."
-        
+        async for vendor_record in results:
+            return {field: vendor_record.get(field) for field in VENDOR_FIELDS}
+        return None
+
+    @staticmethod
+    def _format_insights(vendor_record: dict, match_confidence: float = None) -> str:
+        """
+        Format a supplier record as Markdown insights for the agent.
+
+        :param vendor_record: The supplier record.
+        :param match_confidence: Optional confidence that the record belongs to the evaluated vendor.
+        :return: Formatted vendor insights.
+        """
         # Format response
         insights = (
             f"### **Vendor:** {vendor_record['chunk']}\n"
@@ -62,5 +136,7 @@ class VendorEvaluationPlugin:
             f"- **Contract Disputes:** {vendor_record['contract_disputes']}\n"
             f"- **Additional Notes:** {vendor_record['notes']}\n"
         )
+        if match_confidence is not None:
+            insights += f"- **Name Match Confidence:** {match_confidence:.0%}\n"
         
         return insights
\ No newline at end of file
@@ -0,0 +1,123 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+class RetrievalCache:
+    """
+    Shared in-memory TTL cache for search results.
+
+    Entries are keyed by index name, normalized query text and the query parameters, so repeated
+    evaluations of the same vendor or legal summary skip the search service. The policy and supplier
+    indexes change rarely; call invalidate after an index refresh to drop its entries immediately.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        """
+        Initialize the retrieval cache.
+
+        :param ttl_seconds: Lifetime of an entry; 0 disables caching.
+        :param max_entries: Maximum number of entries kept, evicting the least recently used first.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Normalize query text so trivially different queries share an entry.
+
+        :param query: Query text.
+        :return: Lowercased query with collapsed whitespace.
+        """
+        return re.sub(r"\s+", " ", query or "").strip().lower()
+
+    @classmethod
+    def make_key(cls, index_name: str, query: str, params: dict) -> tuple:
+        """
+        Build the cache key for a search.
+
+        :param index_name: Name of the searched index.
+        :param query: Query text.
+        :param params: Parameters that change the results, such as top, k or selected fields.
+        :return: Hashable key.
+        """
+        return index_name, cls.normalize_query(query), json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, key: tuple):
+        """
+        Look up cached results.
+
+        :param key: Cache key from make_key.
+        :return: The cached results, or None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value):
+        """
+        Store search results.
+
+        :param key: Cache key from make_key.
+        :param value: Results to cache.
+        """
+        if not self.ttl_seconds:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, index_name: str = None) -> int:
+        """
+        Drop cached results, e.g. after an index refresh.
+
+        :param index_name: Index whose entries are dropped; all entries when omitted.
+        :return: Number of entries dropped.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if index_name is None or key[0] == index_name]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> dict:
+        """
+        Report cache hit/miss statistics.
+
+        :return: Counts of hits, misses and entries plus the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Process-wide cache shared by the retrieval plugins
+retrieval_cache = RetrievalCache(
+    ttl_seconds=int(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1000")),
+)
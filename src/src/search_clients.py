@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import os
+import threading
+
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError
+from azure.search.documents.aio import SearchClient
+
+from tracing import current_span
+
+# Async clients keep an aiohttp session bound to the event loop they first ran on. Streamlit runs
+# every session and rerun in its own short-lived loop, so the pooled clients instead live on one
+# process-wide background loop and all searches are scheduled onto it.
+_loop = None
+_clients = {}
+_lock = threading.Lock()
+
+
+def _get_search_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop the pooled search clients run on, starting it on first use."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="search-client-loop", daemon=True).start()
+        return _loop
+
+
+def get_search_client(index_name: str) -> SearchClient:
+    """
+    Returns the process-wide async search client for an index.
+
+    With SEARCH_BACKEND=local the offline in-process index is returned instead of Azure AI Search.
+    The client must only be used from coroutines passed to run_search.
+    """
+    if os.getenv("SEARCH_BACKEND", "azure").lower() == "local":
+        return get_local_search_client(index_name)
+
+    endpoint = os.environ.get("AZURE_AI_SEARCH_ENDPOINT")
+    with _lock:
+        client = _clients.get((endpoint, index_name))
+        if client is None:
+            client = SearchClient(endpoint=endpoint,
+                                  index_name=index_name,
+                                  credential=AzureKeyCredential(os.environ.get("AZURE_AI_SEARCH_API_KEY")))
+            _clients[(endpoint, index_name)] = client
+        return client
+
+
+async def run_search(coroutine):
+    """Runs a coroutine that uses the pooled search clients on their event loop and awaits its result."""
+    # Run in a copy of the caller's context so trace spans opened by the search nest under the caller's
+    context = contextvars.copy_context()
+
+    async def _run_in_context():
+        return await asyncio.get_running_loop().create_task(coroutine, context=context)
+
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_run_in_context(), _get_search_loop()))
+
+
+def get_local_search_client(index_name: str):
+    """Returns the offline in-process search client for an index."""
+    # NumPy and the index files are only loaded when the local backend is used
+    from local_search import get_local_search_client as _get_local_search_client
+
+    return _get_local_search_client(index_name)
+
+
+async def search_with_fallback(index_name: str, make_search):
+    """
+    Runs a search against the configured backend on the search loop.
+
+    When SEARCH_LOCAL_FALLBACK is enabled and Azure AI Search is throttled or unavailable, the
+    search is repeated against the offline index.
+
+    :param index_name: Name of the index to search.
+    :param make_search: Callable that takes a search client and returns the coroutine to run.
+    :return: The result of the search coroutine.
+    """
+    try:
+        return await run_search(make_search(get_search_client(index_name)))
+    except HttpResponseError as e:
+        if e.status_code not in (429, 503) or os.getenv("SEARCH_LOCAL_FALLBACK", "false").lower() != "true":
+            raise
+        print(f"Azure AI Search returned {e.status_code} for {index_name}, falling back to the local index")
+        current_span().set("search_fallback", e.status_code)
+        return await run_search(make_search(get_local_search_client(index_name)))
@@ -0,0 +1,139 @@
+import re
+
+from semantic_kernel.agents.strategies import SelectionStrategy, TerminationStrategy
+from semantic_kernel.contents import AuthorRole
+
+from tracing import span
+
+
+def _last_user_index(history) -> int:
+    """Index of the most recent user message in the history, or -1 if there is none."""
+    for index in range(len(history) - 1, -1, -1):
+        if history[index].role == AuthorRole.USER:
+            return index
+    return -1
+
+
+def _agent_names(messages) -> list:
+    """Names of the agents that authored the given messages, in order."""
+    return [message.name for message in messages if message.role == AuthorRole.ASSISTANT and message.name]
+
+
+class EvaluationSelectionStrategy(SelectionStrategy):
+    """
+    Selects agents locally, without a model round trip for every turn.
+
+    Until the last agent of the evaluation sequence has spoken, the agents are walked in their
+    fixed order. Follow-up questions are routed to an agent with a keyword intent classifier;
+    only when its confidence is below the threshold is the optional LLM fallback consulted.
+    """
+
+    sequence: list[str]
+    intent_keywords: dict[str, list[str]] = {}
+    default_agent: str
+    confidence_threshold: float = 0.6
+    fallback: SelectionStrategy | None = None
+
+    def classify(self, text: str) -> tuple:
+        """
+        Route a follow-up question to an agent by keyword matches.
+
+        :param text: The user's question.
+        :return: The best matching agent name (or None) and the share of all keyword hits it received.
+        """
+        text = text.lower()
+        hits = {
+            name: sum(1 for keyword in keywords if re.search(rf"\b{re.escape(keyword)}", text))
+            for name, keywords in self.intent_keywords.items()
+        }
+        total = sum(hits.values())
+        if not total:
+            return None, 0.0
+        name = max(hits, key=hits.get)
+        return name, hits[name] / total
+
+    async def select_agent(self, agents, history):
+        """
+        Select the next agent to take a turn.
+
+        :param agents: The agents participating in the chat.
+        :param history: The chat history.
+        :return: The agent that takes the next turn.
+        """
+        with span("selection") as current:
+            agent, method = await self._select(agents, history, current)
+            current.set("agent", agent.name)
+            current.set("method", method)
+            return agent
+
+    async def _select(self, agents, history, current) -> tuple:
+        agents_by_name = {agent.name: agent for agent in agents}
+        spoken = _agent_names(history)
+
+        # Initial evaluation: walk the fixed sequence
+        if self.sequence[-1] not in spoken:
+            last_agent = spoken[-1] if spoken else None
+            if last_agent in self.sequence:
+                return agents_by_name[self.sequence[self.sequence.index(last_agent) + 1]], "sequence"
+            return agents_by_name[self.sequence[0]], "sequence"
+
+        # Follow-up: once an agent has answered, hand over to the default agent
+        last_user_index = _last_user_index(history)
+        if _agent_names(history[last_user_index + 1:]) or last_user_index < 0:
+            return agents_by_name[self.default_agent], "default"
+
+        name, confidence = self.classify(str(history[last_user_index].content))
+        current.set("confidence", confidence)
+        if confidence < self.confidence_threshold and self.fallback is not None:
+            return await self.fallback.select_agent(agents, history), "llm"
+        return agents_by_name[name or self.default_agent], "keywords"
+
+
+class EvaluationTerminationStrategy(TerminationStrategy):
+    """
+    Decides locally when the agents are done, without asking the model for a yes/no answer.
+
+    The initial evaluation ends once every agent in the sequence has spoken and the report agent's
+    message contains the expected structural markers. A follow-up question ends once an agent has
+    answered it. maximum_iterations caps the agent turns taken for one user message. The optional
+    LLM fallback is only consulted when a complete report is missing its markers.
+    """
+
+    sequence: list[str]
+    report_agent: str
+    report_markers: list[str] = []
+    fallback: TerminationStrategy | None = None
+
+    async def should_agent_terminate(self, agent, history) -> bool:
+        """
+        Check whether the chat should end after the agent's turn.
+
+        :param agent: The agent that just took a turn.
+        :param history: The chat history.
+        :return: True if the chat should end.
+        """
+        with span("termination", agent=agent.name) as current:
+            terminate, method = await self._should_terminate(agent, history)
+            current.set("terminate", terminate)
+            current.set("method", method)
+            return terminate
+
+    async def _should_terminate(self, agent, history) -> tuple:
+        last_user_index = _last_user_index(history)
+        turn_agents = _agent_names(history[last_user_index + 1:])
+        if len(turn_agents) >= self.maximum_iterations:
+            return True, "maximum_iterations"
+
+        # Follow-up questions are answered by a single agent
+        if self.report_agent in _agent_names(history[:last_user_index + 1]):
+            return bool(turn_agents), "follow_up"
+
+        if agent.name != self.report_agent or not set(self.sequence) <= set(_agent_names(history)):
+            return False, "sequence"
+
+        report = str(history[-1].content).lower()
+        if all(marker.lower() in report for marker in self.report_markers):
+            return True, "markers"
+        if self.fallback is not None:
+            return await self.fallback.should_agent_terminate(agent, history), "llm"
+        return True, "markers"
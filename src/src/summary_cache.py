@@ -0,0 +1,127 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Bump when the stored summary format changes so older entries are ignored
+CACHE_VERSION = 1
+
+
+class SummaryCache:
+    """
+    Persistent SQLite memoization layer for chunk and document summaries.
+
+    A summary depends only on its input text, the document type, the prompt and the chat
+    deployment, so all four are hashed into the key. Editing a prompt therefore produces new
+    keys and old entries simply age out. Entries expire after a TTL and the table is capped at
+    a maximum number of rows, evicting the least recently used first.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int):
+        """
+        Initialize the summary cache.
+
+        :param db_path: Path of the SQLite database file.
+        :param ttl_seconds: Lifetime of an entry; 0 disables expiry.
+        :param max_entries: Maximum number of entries kept in the cache.
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS summaries_accessed_at ON summaries (accessed_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(kind: str, text: str, doc_type: str, prompt: str, deployment: str) -> str:
+        """
+        Build the cache key for a summary.
+
+        :param kind: What is cached, e.g. "chunk" or "document".
+        :param text: Input text that was summarized.
+        :param doc_type: Document type, "rfp" or "proposal".
+        :param prompt: Prompt text used for the summary.
+        :param deployment: Azure OpenAI chat deployment name.
+        :return: Hex digest identifying the summary.
+        """
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        payload = json.dumps([CACHE_VERSION, kind, text_hash, doc_type, prompt, deployment])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Look up a cached summary.
+
+        :param key: Cache key from make_key.
+        :return: The cached value, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, kind: str, value):
+        """
+        Store a summary and trim the cache to its maximum size.
+
+        :param key: Cache key from make_key.
+        :param kind: What is cached, e.g. "chunk" or "document".
+        :param value: JSON-serializable summary.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, kind, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value), now, now),
+            )
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM summaries WHERE key IN ("
+                "SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        """
+        Report cache hit/miss statistics.
+
+        :return: Counts of hits and misses plus the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,238 @@
+"""
+Lightweight tracing of the analysis pipeline.
+
+Spans (analyze, chunk, map, reduce, retrieve, agent_turn, selection, termination, ...) carry their
+duration plus attributes such as token counts, cache hits and retries. Finished spans are exported to
+
+- a local JSON-lines file when TRACE_JSONL_PATH is set,
+- Application Insights when APPLICATIONINSIGHTS_CONNECTION_STRING is set and azure-monitor-opentelemetry is installed,
+- an OTLP collector when OTEL_EXPORTER_OTLP_ENDPOINT is set and opentelemetry-exporter-otlp is installed.
+
+OpenTelemetry is optional; without it spans are only written to the JSON-lines file. Set
+TRACING_ENABLED=false to turn tracing off entirely.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:
+    otel_trace = None
+
+TRACER_NAME = "rfp-analyzer"
+
+# HTTP status codes the service SDKs retry
+RETRIED_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+_current = contextvars.ContextVar("current_span", default=None)
+_configured = False
+_configure_lock = threading.Lock()
+_tracer = None
+_jsonl_path = None
+_jsonl_lock = threading.Lock()
+
+
+def _configure():
+    """Set up the exporters from the environment on first use."""
+    global _configured, _tracer, _jsonl_path
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+        _jsonl_path = os.getenv("TRACE_JSONL_PATH") or None
+        if otel_trace is None:
+            return
+
+        connection_string = os.getenv("APPLICATIONINSIGHTS_CONNECTION_STRING")
+        if connection_string:
+            try:
+                from azure.monitor.opentelemetry import configure_azure_monitor
+
+                configure_azure_monitor(connection_string=connection_string)
+            except ImportError:
+                print("azure-monitor-opentelemetry is not installed, traces are not sent to Application Insights")
+        elif os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+                provider = TracerProvider()
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                otel_trace.set_tracer_provider(provider)
+            except ImportError:
+                print("opentelemetry-exporter-otlp is not installed, traces are not sent to the OTLP endpoint")
+        _tracer = otel_trace.get_tracer(TRACER_NAME)
+
+
+def _enabled() -> bool:
+    return os.getenv("TRACING_ENABLED", "true").lower() == "true"
+
+
+class Span:
+    """
+    A timed pipeline step with attributes.
+    """
+
+    def __init__(self, name: str, attributes: dict, parent=None, start_ns: int = None):
+        """
+        Start a span.
+
+        :param name: Name of the step, e.g. "map" or "agent_turn".
+        :param attributes: Initial attributes.
+        :param parent: Enclosing span, if any.
+        :param start_ns: Start time in nanoseconds since the epoch; now when omitted.
+        """
+        self.name = name
+        self.attributes = dict(attributes)
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.start_ns = start_ns or time.time_ns()
+        self._otel_span = _tracer.start_span(name, start_time=self.start_ns) if _tracer else None
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value):
+        """Set an attribute."""
+        with self._lock:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount=1):
+        """Add to a numeric attribute, e.g. a retry or token counter."""
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def record_usage(self, usage):
+        """
+        Add the token usage of a model call.
+
+        :param usage: OpenAI-style usage object or dict with prompt_tokens and completion_tokens.
+        """
+        if usage is None:
+            return
+        for field in ("prompt_tokens", "completion_tokens"):
+            value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+            if value:
+                self.add(field, value)
+
+    def end(self, error: BaseException = None):
+        """Finish the span and export it."""
+        end_ns = time.time_ns()
+        if error is not None:
+            self.set("error", f"{type(error).__name__}: {error}")
+
+        if self._otel_span is not None:
+            for key, value in self.attributes.items():
+                self._otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else json.dumps(value, default=str))
+            if error is not None:
+                self._otel_span.record_exception(error)
+                self._otel_span.set_status(Status(StatusCode.ERROR))
+            self._otel_span.end(end_time=end_ns)
+
+        if _jsonl_path:
+            record = {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent.span_id if self.parent else None,
+                "name": self.name,
+                "start": self.start_ns / 1e9,
+                "duration_ms": (end_ns - self.start_ns) / 1e6,
+                "attributes": self.attributes,
+            }
+            with _jsonl_lock, open(_jsonl_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record, default=str) + "\n")
+
+
+class _NullSpan:
+    """Span used when tracing is disabled or no span is active; every call is a no-op."""
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def record_usage(self, usage):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Trace a block as a span nested in the current one.
+
+    :param name: Name of the step.
+    :param attributes: Initial attributes.
+    :return: Context manager yielding the span.
+    """
+    if not _enabled():
+        yield _NULL_SPAN
+        return
+    _configure()
+
+    current = Span(name, attributes, parent=_current.get())
+    token = _current.set(current)
+    otel_token = None
+    if current._otel_span is not None:
+        otel_token = otel_context.attach(otel_trace.set_span_in_context(current._otel_span))
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    else:
+        current.end()
+    finally:
+        if otel_token is not None:
+            otel_context.detach(otel_token)
+        _current.reset(token)
+
+
+def record_span(name: str, start_ns: int, **attributes):
+    """
+    Export a span for a step that has already finished, e.g. an agent turn measured between two yields.
+
+    :param name: Name of the step.
+    :param start_ns: Start time in nanoseconds since the epoch, from time.time_ns().
+    :param attributes: Attributes of the span.
+    """
+    if not _enabled():
+        return
+    _configure()
+    Span(name, attributes, parent=_current.get(), start_ns=start_ns).end()
+
+
+def current_span():
+    """Returns the active span, or a no-op span if there is none."""
+    return _current.get() or _NULL_SPAN
+
+
+def count_retry(status_code: int):
+    """Count a retried HTTP response on the active span."""
+    if status_code in RETRIED_STATUS_CODES:
+        current_span().add("retries")
+
+
+async def count_retry_hook(response):
+    """httpx response hook counting retried responses of an async client on the active span."""
+    count_retry(response.status_code)
+
+
+def count_retry_hook_sync(response):
+    """httpx response hook counting retried responses of a sync client on the active span."""
+    count_retry(response.status_code)
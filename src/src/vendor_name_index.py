@@ -0,0 +1,147 @@
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+
+# Legal-form suffixes ignored when comparing vendor names. Descriptive words such as "Systems" or
+# "Solutions" are kept, since they tell apart different companies like Contoso Systems and Contoso Solutions.
+NAME_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "plc", "gmbh", "ag",
+    "sa", "bv", "pty",
+}
+
+def normalize_name(name: str) -> str:
+    """Lowercase a vendor name and strip punctuation and repeated whitespace."""
+    return " ".join(re.findall(r"[a-z0-9]+", (name or "").lower()))
+
+
+def core_name(name: str) -> str:
+    """Normalized vendor name without legal-form suffixes such as "Inc." or "GmbH"."""
+    words = normalize_name(name).split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _ngrams(text: str, n: int) -> set:
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def name_similarity(first: str, second: str, ngram_size: int = 3) -> float:
+    """
+    Compare two vendor names.
+
+    :param first: A vendor name.
+    :param second: Another vendor name.
+    :param ngram_size: Length of the character n-grams.
+    :return: Similarity between 0 and 1.
+    """
+    if normalize_name(first) == normalize_name(second):
+        return 1.0
+    if core_name(first) == core_name(second):
+        return 0.95
+    a, b = _ngrams(core_name(first), ngram_size), _ngrams(core_name(second), ngram_size)
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def get_match_threshold() -> float:
+    """Returns the minimum name similarity for a supplier record to count as the evaluated vendor."""
+    return float(os.getenv("VENDOR_NAME_MATCH_THRESHOLD", "0.6"))
+
+
+class VendorNameIndex:
+    """
+    In-memory index resolving vendor names to supplier records.
+
+    Exact matches on the normalized name, with or without legal-form suffixes such as "Inc." or "Ltd",
+    are found by dictionary lookup. Other names are compared by character n-gram similarity
+    (Dice coefficient) against candidates sharing at least one n-gram.
+    """
+
+    def __init__(self, records: list, name_field: str = "vendor_name", ngram_size: int = 3, threshold: float = 0.6):
+        """
+        Build the name index.
+
+        :param records: Supplier records.
+        :param name_field: Field of the record holding the vendor name.
+        :param ngram_size: Length of the character n-grams.
+        :param threshold: Minimum similarity for a fuzzy match.
+        """
+        self.records = records
+        self.name_field = name_field
+        self.ngram_size = ngram_size
+        self.threshold = threshold
+        self._exact = {}
+        self._core = {}
+        self._grams = []
+        self._postings = defaultdict(set)
+
+        for position, record in enumerate(records):
+            name = record.get(name_field, "")
+            self._exact.setdefault(normalize_name(name), position)
+            self._core.setdefault(core_name(name), position)
+            grams = _ngrams(core_name(name), ngram_size)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings[gram].add(position)
+
+    def similarity(self, first: str, second: str) -> float:
+        """Compare two vendor names with the n-gram size of the index."""
+        return name_similarity(first, second, self.ngram_size)
+
+    def resolve(self, name: str) -> tuple:
+        """
+        Find the supplier record for a vendor name.
+
+        :param name: Vendor name as written in the proposal.
+        :return: The matching record (None below the threshold) and the match confidence.
+        """
+        position = self._exact.get(normalize_name(name))
+        if position is not None:
+            return self.records[position], 1.0
+        position = self._core.get(core_name(name))
+        if position is not None:
+            return self.records[position], 0.95
+
+        grams = _ngrams(core_name(name), self.ngram_size)
+        candidates = set().union(*(self._postings.get(gram, set()) for gram in grams)) if grams else set()
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            score = 2 * len(grams & self._grams[candidate]) / (len(grams) + len(self._grams[candidate]))
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is None or best_score < self.threshold:
+            return None, best_score
+        return self.records[best], best_score
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_vendor_name_index() -> VendorNameIndex:
+    """
+    Returns the process-wide vendor name index over the supplier dataset.
+
+    The index is opt-in: it is only built when SUPPLIER_INSIGHTS_DATASET points to an export of the
+    records in the supplier index, so vendors are never resolved against data the index doesn't hold.
+
+    :return: The name index, or None when no dataset is configured.
+    """
+    global _index
+    path = os.getenv("SUPPLIER_INSIGHTS_DATASET")
+    if not path:
+        return None
+    with _lock:
+        if _index is None:
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    records = json.load(file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Failed to load supplier dataset for the vendor name index: {e}")
+                records = []
+            _index = VendorNameIndex(records, threshold=get_match_threshold())
+        return _index
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application modules are imported by name from src/src, as when running streamlit from there
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
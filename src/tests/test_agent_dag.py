@@ -0,0 +1,44 @@
+import asyncio
+
+from semantic_kernel import Kernel
+from semantic_kernel.agents import ChatCompletionAgent
+
+from agent_dag import AgentDAG, user_message
+from benchmark_fakes import FakeAzureOpenAI, LatencyProfile, ServiceStats
+
+
+def _agent(name: str) -> ChatCompletionAgent:
+    kernel = Kernel()
+    kernel.add_service(FakeAzureOpenAI(LatencyProfile(0), ServiceStats(), completion_tokens=20).create_chat_completion())
+    return ChatCompletionAgent(kernel=kernel, name=name, instructions=f"You are {name}.")
+
+
+def _dag() -> AgentDAG:
+    agents = {name: _agent(name) for name in ("First", "Second", "Report")}
+    return AgentDAG(agents, {"First": [], "Second": [], "Report": ["First", "Second"]}, ["First", "Second", "Report"])
+
+
+def test_run_stream_yields_text_tokens_of_agent_response_items():
+    async def collect():
+        ttft = {}
+        tokens = [item async for item in _dag().run_stream(user_message("Evaluate the proposal."), ttft)]
+        return tokens, ttft
+
+    tokens, ttft = asyncio.run(collect())
+
+    assert tokens
+    assert all(isinstance(token, str) for _, token in tokens)
+    assert [name for name, _ in tokens] == sorted((name for name, _ in tokens), key=["First", "Second", "Report"].index)
+    assert set(ttft) == {"First", "Second", "Report"}
+    report = "".join(token for name, token in tokens if name == "Report")
+    assert "Final score" in report
+
+
+def test_run_returns_named_messages_in_order():
+    async def collect():
+        return [message async for message in _dag().run(user_message("Evaluate the proposal."))]
+
+    messages = asyncio.run(collect())
+
+    assert [message.name for message in messages] == ["First", "Second", "Report"]
+    assert all(isinstance(message.content, str) and message.content for message in messages)
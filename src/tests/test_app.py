@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from semantic_kernel import Kernel
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.contents import AuthorRole
+
+import app
+from benchmark_fakes import FakeAzureOpenAI, LatencyProfile, ServiceStats
+
+
+def _chat():
+    kernel = Kernel()
+    kernel.add_service(FakeAzureOpenAI(LatencyProfile(0), ServiceStats(), completion_tokens=20).create_chat_completion())
+    agents = {key: ChatCompletionAgent(kernel=kernel, name=name, instructions=f"You are {name}.")
+              for key, name in app.AGENT_NAMES.items()}
+    return app.create_group_chat(kernel, agents)
+
+
+def _stream(chat, prompt, ttft=None):
+    async def collect():
+        return [item async for item in app.invoke_chat_stream(chat, prompt, ttft)]
+    return asyncio.run(collect())
+
+
+def _turn(chat, prompt):
+    """Names of the agents that answered the last user message, from the chat history."""
+    messages = chat.history.messages
+    last_user = max(index for index, message in enumerate(messages) if message.role == AuthorRole.USER)
+    assert messages[last_user].content == prompt
+    return [message.name for message in messages[last_user + 1:]]
+
+
+@pytest.mark.parametrize("orchestration", ["dag", "group_chat"])
+def test_invoke_chat_stream_adds_agent_replies_to_the_history(monkeypatch, orchestration):
+    monkeypatch.setenv("AGENT_ORCHESTRATION", orchestration)
+    monkeypatch.setenv("SELECTION_LLM_FALLBACK", "false")
+    chat = _chat()
+
+    ttft = {}
+    tokens = _stream(chat, "Evaluate the proposal.", ttft)
+
+    assert _turn(chat, "Evaluate the proposal.") == app.EVALUATION_SEQUENCE
+    assert [name for name, _ in tokens] == sorted((name for name, _ in tokens), key=app.EVALUATION_SEQUENCE.index)
+    assert set(ttft) == set(app.EVALUATION_SEQUENCE)
+    for message in chat.history.messages[1:]:
+        assert message.content == "".join(token for name, token in tokens if name == message.name)
+
+    follow_ups = [
+        ("What are the legal risks?", app.AGENT_NAMES["legal_compliance"]),
+        ("How is the vendor reputation?", app.AGENT_NAMES["vendor_evaluation"]),
+        ("What negotiation leverage do we have?", app.AGENT_NAMES["negotiation_strategy"]),
+    ]
+    for prompt, agent in follow_ups:
+        tokens = _stream(chat, prompt)
+        assert {name for name, _ in tokens} == {agent}
+        assert _turn(chat, prompt) == [agent]